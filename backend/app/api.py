@@ -1,10 +1,60 @@
 # api.py - Enhanced with AI capabilities and Hospital Finder
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 import json
 import csv
+import decimal
+import hashlib
+import importlib.util
+import logging
 import math
+import mmap
 import os
+import pickle
+import re
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
+from typing import Any, List, Optional, Union, get_args, get_origin, get_type_hints
+import numpy as np
+
+from request_batcher import RequestBatcher
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+try:
+    from flask_caching import Cache
+except ImportError:
+    Cache = None
+
+try:
+    from numba import njit
+    NUMBA_ENABLED = True
+except ImportError:
+    NUMBA_ENABLED = False
 
 # Import SQL-based disease predictor (with fallback to original)
 try:
@@ -76,46 +126,80 @@ except ImportError as e:
             "disclaimer": "Personalized nutrition advice should come from qualified healthcare providers."
         }
 
-# Import voice and report processing modules
-try:
-    from voice_processor import process_voice_input, generate_voice_response
-    from report_scanner import scan_medical_report
-    VOICE_ENABLED = True
-    REPORT_SCAN_ENABLED = True
-    print("✅ Voice and report scanning loaded successfully")
-except ImportError as e:
-    print(f"⚠️ Voice/Report processing not available (using fallback): {e}")
-    VOICE_ENABLED = False
-    REPORT_SCAN_ENABLED = False
-    
-    # Fallback implementations
-    def process_voice_input(audio_data):
-        """Voice input fallback"""
-        return {
-            "success": False,
-            "text": "",
-            "message": "Voice input requires additional setup. Please type your symptoms instead."
-        }
-    
-    def generate_voice_response(text):
-        """Voice output fallback"""
-        return {
-            "success": False,
-            "message": "Voice output requires additional setup. Please read the text response.",
-            "audio_url": None
-        }
-    
-    def scan_medical_report(image_data):
-        """Report scanning fallback"""
-        return {
-            "success": False,
-            "text": "",
-            "message": "Report scanning requires additional setup. Please type your information."
-        }
+# Voice and report processing modules pull in speech_recognition, pyttsx3, OpenCV
+# and Tesseract, so they are imported on first use. Availability is decided up
+# front from whether their dependencies can be found, without importing them.
+def _modules_available(*names):
+    return all(importlib.util.find_spec(name) is not None for name in names)
+
+
+VOICE_ENABLED = _modules_available("speech_recognition", "pyttsx3")
+REPORT_SCAN_ENABLED = _modules_available("cv2", "pytesseract", "PIL", "PyPDF2", "docx")
+if VOICE_ENABLED and REPORT_SCAN_ENABLED:
+    print("✅ Voice and report scanning available (loaded on first use)")
+else:
+    print("⚠️ Voice/Report processing not fully available (using fallback)")
+
+
+# Fallback implementations
+def _process_voice_input_fallback(audio_data):
+    """Voice input fallback"""
+    return {
+        "success": False,
+        "text": "",
+        "error": "Voice input requires additional setup. Please type your symptoms instead.",
+        "message": "Voice input requires additional setup. Please type your symptoms instead."
+    }
+
+def _generate_voice_response_fallback(text):
+    """Voice output fallback"""
+    return {
+        "success": False,
+        "error": "Voice output requires additional setup. Please read the text response.",
+        "message": "Voice output requires additional setup. Please read the text response.",
+        "audio_url": None
+    }
+
+def _scan_medical_report_fallback(image_data, filename=None):
+    """Report scanning fallback"""
+    return {
+        "success": False,
+        "text": "",
+        "error": "Report scanning requires additional setup. Please type your information.",
+        "message": "Report scanning requires additional setup. Please type your information."
+    }
+
+
+@lru_cache(maxsize=None)
+def _voice():
+    """(process_voice_input, generate_voice_response), imported on first call"""
+    try:
+        from voice_processor import process_voice_input, generate_voice_response
+        print("✅ Voice processing loaded successfully")
+        return process_voice_input, generate_voice_response
+    except ImportError as e:
+        print(f"⚠️ Voice processing not available (using fallback): {e}")
+        return _process_voice_input_fallback, _generate_voice_response_fallback
+
+
+@lru_cache(maxsize=None)
+def _report_scanner():
+    """scan_medical_report, imported on first call"""
+    try:
+        from report_scanner import scan_medical_report
+        print("✅ Report scanning loaded successfully")
+        return scan_medical_report
+    except ImportError as e:
+        print(f"⚠️ Report scanning not available (using fallback): {e}")
+        return _scan_medical_report_fallback
 
 # Import medicine recommendation system
 try:
-    from medicine_recommender import get_medicine_recommendations_for_condition, get_medicine_details, search_medicines_by_symptoms
+    from medicine_recommender import (
+        get_medicine_recommendations_for_condition, get_medicine_recommendations_for_conditions,
+        get_medicine_details, search_medicines_by_symptoms,
+        get_medicine_recommendations_batch, search_medicines_by_symptoms_batch
+    )
     MEDICINE_ENABLED = True
     print("✅ Medicine recommendation system loaded")
 except ImportError as e:
@@ -140,35 +224,332 @@ except ImportError as e:
         USE_SQL_HOSPITALS = False
         HospitalFinder = None
 
+# Thread-local SQL session used by the SQL predictor and hospital finder
+try:
+    from database import Session as DBSession
+except ImportError:
+    DBSession = None
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
+if DBSession is not None:
+    @app.teardown_appcontext
+    def remove_db_session(exc=None):
+        """Discard the request thread's SQL session once the request is done"""
+        DBSession.remove()
+
+# Voice/report uploads run slow OCR and speech work on the request thread. Cap how
+# many can run at once so they never occupy every worker thread and /api/query
+# keeps being served; extra uploads get a quick 503 instead of queueing.
+UPLOAD_SLOTS = int(os.getenv('UPLOAD_SLOTS', 2))
+_upload_slots = threading.BoundedSemaphore(UPLOAD_SLOTS)
+
+# Independent blocking calls inside one request (LLM HTTP, medicine lookups,
+# hospital search) are overlapped on this pool instead of running back to back.
+# Threads start on first submit, so none exist in a pre-fork master.
+IO_POOL_WORKERS = int(os.getenv('IO_POOL_WORKERS', 16))
+io_pool = ThreadPoolExecutor(max_workers=IO_POOL_WORKERS, thread_name_prefix='api-io')
+
+# Symptom/medicine JSON bodies are a few hundred bytes; cap them well below the
+# upload limit so an oversized body is refused before it is buffered or parsed.
+# MAX_CONTENT_LENGTH is the hard backstop (also covers chunked bodies).
+JSON_BODY_LIMIT = int(os.getenv('JSON_BODY_LIMIT', 64 * 1024))
+UPLOAD_BODY_LIMIT = int(os.getenv('UPLOAD_BODY_LIMIT', 16 * 1024 * 1024))
+app.config['MAX_CONTENT_LENGTH'] = UPLOAD_BODY_LIMIT
+
+
+def _body_too_large():
+    return jsonify({
+        "success": False,
+        "error": "Request body too large"
+    }), 413
+
+
+@app.before_request
+def reject_oversized_body():
+    """413 any JSON body over JSON_BODY_LIMIT (uploads over UPLOAD_BODY_LIMIT) from its Content-Length"""
+    length = request.content_length
+    if length is None:
+        return None
+    limit = UPLOAD_BODY_LIMIT if request.mimetype == 'multipart/form-data' else JSON_BODY_LIMIT
+    if length > limit:
+        return _body_too_large()
+    return None
+
+
+@app.errorhandler(413)
+def request_entity_too_large(e):
+    return _body_too_large()
+
+
+def _json_body():
+    """Parse the JSON request body with orjson (json module fallback); empty body -> {}"""
+    raw = request.get_data(cache=False)
+    if not raw:
+        return {}
+    return orjson.loads(raw) if orjson else json.loads(raw)
+
+
+@dataclass(frozen=True)
+class AnalyzeRequest:
+    """Typed body of POST /api/medicine/analyze (explicit nulls fall back to the defaults)"""
+    symptoms: Optional[Union[List[str], str]] = field(default_factory=list)
+    location: Optional[str] = ''
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    age: Optional[Union[int, float]] = None
+    gender: Optional[str] = 'other'
+    pregnant: Optional[bool] = False
+    allergies: Optional[List[str]] = field(default_factory=list)
+    timestamp: Any = ''
+    
+    def __post_init__(self):
+        if self.location is None:
+            object.__setattr__(self, 'location', '')
+        if self.gender is None:
+            object.__setattr__(self, 'gender', 'other')
+
+
+REQUEST_DECODE_ERRORS = (ValueError, TypeError, AttributeError) + ((msgspec.MsgspecError,) if msgspec else ())
+
+
+@lru_cache(maxsize=None)
+def _schema_types(schema):
+    return {f.name: get_type_hints(schema)[f.name] for f in fields(schema)}
+
+
+def _check_type(value, tp, path):
+    """`value` checked against a field annotation the way msgspec decodes JSON (ints widen to float)"""
+    if tp is Any:
+        return value
+    origin = get_origin(tp)
+    if origin is Union:
+        for arg in get_args(tp):
+            try:
+                return _check_type(value, arg, path)
+            except TypeError:
+                pass
+    elif origin is list:
+        if isinstance(value, list):
+            return [_check_type(item, get_args(tp)[0], f"{path}[{i}]") for i, item in enumerate(value)]
+    elif tp is type(None):
+        if value is None:
+            return value
+    elif tp in (int, float):
+        if isinstance(value, (int, float) if tp is float else int) and not isinstance(value, bool):
+            return tp(value)
+    elif isinstance(value, tp):
+        return value
+    raise TypeError(f"Expected `{getattr(tp, '__name__', tp)}`, got `{type(value).__name__}` - at `{path}`")
+
+
+def _parse_body(schema):
+    """
+    Decode the JSON body into `schema`: msgspec straight from bytes, or json with
+    unknown keys dropped and the same type checks; either way mistyped fields raise
+    """
+    raw = request.get_data(cache=False) or b'{}'
+    if msgspec is not None:
+        return msgspec.json.decode(raw, type=schema)
+    data = orjson.loads(raw) if orjson else json.loads(raw)
+    if not isinstance(data, dict):
+        raise TypeError(f"Expected `object`, got `{type(data).__name__}`")
+    types = _schema_types(schema)
+    return schema(**{k: _check_type(v, types[k], f"$.{k}") for k, v in data.items() if k in types})
+
+
+if orjson is not None:
+    class OrjsonProvider(JSONProvider):
+        """Flask JSON provider that serializes with orjson (jsonify, app.json.dumps)"""
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        mimetype = "application/json"
+
+        @staticmethod
+        def _default(obj):
+            # Same fallback as Flask's default provider for DB numeric columns
+            if isinstance(obj, decimal.Decimal):
+                return str(obj)
+            raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, default=self._default, option=self.option).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            body = orjson.dumps(obj, default=self._default, option=self.option)
+            return self._app.response_class(body, mimetype=self.mimetype)
+
+    app.json = OrjsonProvider(app)
+
+# Response cache for the medicine endpoints: Redis when REDIS_URL is set,
+# otherwise per-process memory; disabled when Flask-Caching is not installed
+if Cache is not None:
+    cache = Cache(app, config=(
+        {'CACHE_TYPE': 'RedisCache', 'CACHE_REDIS_URL': os.getenv('REDIS_URL')} if os.getenv('REDIS_URL')
+        else {'CACHE_TYPE': 'SimpleCache'}
+    ))
+else:
+    cache = None
+
+
+def cache_ok_responses(timeout):
+    """cache.cached() that only stores 200 responses; a no-op without Flask-Caching"""
+    if cache is None:
+        return lambda view: view
+    return cache.cached(timeout=timeout, response_filter=lambda rv: getattr(rv, 'status_code', None) == 200)
+
 # Get the project root directory
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 # -------------------------
 # Load JSON knowledge bases
 # -------------------------
-with open(os.path.join(project_root, "config", "symptom_lexicon.json")) as f:
-    symptom_lexicon = json.load(f)
+KNOWLEDGE_BASE_FILES = {
+    "symptom_lexicon": os.path.join(project_root, "config", "symptom_lexicon.json"),
+    "red_flags": os.path.join(project_root, "config", "red_flags.json"),
+    "conditions": os.path.join(project_root, "config", "conditions_list.json"),
+    "departments": os.path.join(project_root, "config", "department_map.json"),
+}
+knowledge_base_path = os.path.join(project_root, "config", "knowledge_base.pkl")
+
+
+def load_knowledge_base():
+    """
+    Load all JSON knowledge bases from one pickle bundle (config/knowledge_base.pkl).
+    The bundle is read through a read-only mmap, so every worker unpickles from the
+    same page-cache pages, and it is rebuilt whenever any JSON file is newer.
+    """
+    json_mtime = max(os.path.getmtime(path) for path in KNOWLEDGE_BASE_FILES.values())
+    if os.path.exists(knowledge_base_path) and os.path.getmtime(knowledge_base_path) >= json_mtime:
+        try:
+            with open(knowledge_base_path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return pickle.loads(mm)
+        except (OSError, ValueError, pickle.UnpicklingError, EOFError) as e:
+            print(f"⚠️ Ignoring unreadable cache {knowledge_base_path}: {e}")
+
+    kb = {}
+    for name, path in KNOWLEDGE_BASE_FILES.items():
+        with open(path, "rb") as f:
+            raw = f.read()
+        kb[name] = orjson.loads(raw) if orjson else json.loads(raw)
+
+    try:
+        tmp_path = f"{knowledge_base_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(kb, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, knowledge_base_path)
+    except OSError as e:
+        print(f"⚠️ Could not write cache {knowledge_base_path}: {e}")
+    return kb
+
+
+_kb = load_knowledge_base()
+symptom_lexicon = _kb["symptom_lexicon"]
+red_flags = _kb["red_flags"]
+conditions = _kb["conditions"]
+departments = _kb["departments"]
+del _kb
+
+# Lowercased once here so per-request matching allocates no new strings
+SYMPTOM_LEXICON_LOWER = [
+    (canonical, [canonical.lower()] + [syn.lower() for syn in synonyms])
+    for canonical, synonyms in symptom_lexicon["symptom_lexicon"].items()
+]
+# One compiled alternation per red flag, searched once against all symptoms
+RED_FLAG_PATTERNS = [
+    (flag, re.compile("|".join(re.escape(trigger.lower()) for trigger in flag["trigger_symptoms"])))
+    for flag in red_flags["red_flags"]
+    if flag["trigger_symptoms"]
+]
+
+# -------------------------
+# Load hospital dataset
+# -------------------------
+HOSPITAL_COLUMNS = ("location_lat", "location_lon", "hospital_name", "city", "contact_number", "departments_available")
+hospitals_csv_path = os.path.join(project_root, "data", "hospitals.csv")
+hospitals_npz_path = os.path.join(project_root, "data", "hospitals.npz")
+
 
-with open(os.path.join(project_root, "config", "red_flags.json")) as f:
-    red_flags = json.load(f)
+def load_hospital_columns():
+    """Load hospital columns, preferring the .npz written by backend/convert_hospitals.py"""
+    if os.path.exists(hospitals_npz_path) and os.path.getmtime(hospitals_npz_path) >= os.path.getmtime(hospitals_csv_path):
+        with np.load(hospitals_npz_path) as data:
+            return {column: data[column] for column in HOSPITAL_COLUMNS}
 
-with open(os.path.join(project_root, "config", "conditions_list.json")) as f:
-    conditions = json.load(f)
+    columns = {column: [] for column in HOSPITAL_COLUMNS}
+    skipped = 0
+    with open(hospitals_csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            # Rows are validated here once so find_hospitals never has to
+            try:
+                lat, lon = float(row["location_lat"]), float(row["location_lon"])
+            except (KeyError, TypeError, ValueError):
+                skipped += 1
+                continue
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                skipped += 1
+                continue
+            columns["location_lat"].append(lat)
+            columns["location_lon"].append(lon)
+            for column in HOSPITAL_COLUMNS[2:]:
+                columns[column].append(row[column])
+
+    if skipped:
+        print(f"⚠️ Skipped {skipped} hospital rows with invalid coordinates")
+    return columns
 
-with open(os.path.join(project_root, "config", "department_map.json")) as f:
-    departments = json.load(f)
 
 # -------------------------
-# Load hospital dataset (CSV)
+# Hospital arrays (structure-of-arrays) for vectorized search
 # -------------------------
-hospitals = []
-with open(os.path.join(project_root, "data", "hospitals.csv"), newline="", encoding="utf-8") as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        hospitals.append(row)
+_columns = load_hospital_columns()
+hosp_lat = np.asarray(_columns["location_lat"], dtype=np.float64)
+hosp_lon = np.asarray(_columns["location_lon"], dtype=np.float64)
+hosp_name = np.asarray(_columns["hospital_name"], dtype=object)
+hosp_city = np.asarray(_columns["city"], dtype=object)
+hosp_contact = np.asarray(_columns["contact_number"], dtype=object)
+hosp_depts = np.asarray(_columns["departments_available"], dtype=object)
+
+# Hospital coordinates never change, so their trig terms are computed once here
+hosp_lat_rad = np.radians(hosp_lat)
+hosp_lon_rad = np.radians(hosp_lon)
+cos_hosp_lat_rad = np.cos(hosp_lat_rad)
+
+# Per-department KD-trees over unit-sphere (x, y, z) points. Below this size a
+# linear scan is faster than a tree query, so small departments are scanned.
+KDTREE_MIN_HOSPITALS = 256
+hosp_xyz = np.column_stack((
+    cos_hosp_lat_rad * np.cos(hosp_lon_rad),
+    cos_hosp_lat_rad * np.sin(hosp_lon_rad),
+    np.sin(hosp_lat_rad),
+))
+
+del _columns
+
+
+@lru_cache(maxsize=1024)
+def _department_rows(department):
+    """
+    Row indices of the hospitals whose departments_available text contains
+    `department` (a substring test, so "Cardio" matches "Cardiology")
+    """
+    return np.asarray([i for i, available in enumerate(hosp_depts) if department in available], dtype=np.int32)
+
+
+@lru_cache(maxsize=1024)
+def _department_tree(department):
+    """KD-tree over the department's hospitals, or None when too few for one to pay off"""
+    idx = _department_rows(department)
+    if cKDTree is None or idx.size < KDTREE_MIN_HOSPITALS:
+        return None
+    return cKDTree(hosp_xyz[idx])
+
 
 # -------------------------
 # Initialize Hospital Finder
@@ -187,36 +568,100 @@ if HOSPITAL_FINDER_ENABLED:
 # -------------------------
 # Utility: Haversine formula
 # -------------------------
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371  # Earth radius in km
-    d_lat = math.radians(lat2 - lat1)
-    d_lon = math.radians(lon2 - lon1)
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine(lat1, lon1, lat2, lon2, _r=math.radians, _s=math.sin, _c=math.cos,
+              _a2=math.atan2, _sq=math.sqrt, _R2=2 * EARTH_RADIUS_KM):
+    # Scalar version for single-pair callers; math functions are bound as
+    # defaults so calls in a loop avoid global/attribute lookups
+    d_lat = _r(lat2 - lat1)
+    d_lon = _r(lon2 - lon1)
+    a = _s(d_lat * 0.5) ** 2 + _c(_r(lat1)) * _c(_r(lat2)) * _s(d_lon * 0.5) ** 2
+    return _R2 * _a2(_sq(a), _sq(1 - a))
+
+
+def haversine_vector(lat, lon, lats_rad, lons_rad, cos_lats):
+    """
+    Distance in km from one point (degrees) to every point in the given arrays.
+    The arrays hold latitudes/longitudes in radians and the cosine of each latitude.
+    """
+    lat_rad = math.radians(lat)
+    d_lat = lats_rad - lat_rad
+    d_lon = lons_rad - math.radians(lon)
     a = (
-        math.sin(d_lat / 2) ** 2
-        + math.cos(math.radians(lat1))
-        * math.cos(math.radians(lat2))
-        * math.sin(d_lon / 2) ** 2
+        np.sin(d_lat / 2) ** 2
+        + math.cos(lat_rad) * cos_lats * np.sin(d_lon / 2) ** 2
     )
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
+    return 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+if NUMBA_ENABLED:
+    @njit(cache=True, fastmath=True)
+    def nearest_k(lat_rad, lon_rad, cos_lat, rows, lats_rad, lons_rad, cos_lats, k):
+        """
+        Fused haversine + top-k selection over the hospitals listed in `rows`.
+        Returns (row indices, distances in km) for the k nearest, nearest first.
+        """
+        best_rows = np.full(k, -1, dtype=np.int64)
+        best_dist = np.full(k, np.inf)
+        for i in range(rows.shape[0]):
+            row = rows[i]
+            s_lat = math.sin((lats_rad[row] - lat_rad) * 0.5)
+            s_lon = math.sin((lons_rad[row] - lon_rad) * 0.5)
+            a = s_lat * s_lat + cos_lat * cos_lats[row] * s_lon * s_lon
+            d = 2 * EARTH_RADIUS_KM * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+            if d < best_dist[k - 1]:
+                # Insertion into the small sorted top-k buffer
+                j = k - 1
+                while j > 0 and best_dist[j - 1] > d:
+                    best_dist[j] = best_dist[j - 1]
+                    best_rows[j] = best_rows[j - 1]
+                    j -= 1
+                best_dist[j] = d
+                best_rows[j] = row
+        return best_rows, best_dist
+
+    # Compile once at startup instead of on the first request
+    nearest_k(0.0, 0.0, 1.0, np.zeros(1, dtype=np.intp), np.zeros(1), np.zeros(1), np.ones(1), 1)
 
 
 # -------------------------
 # AI-Enhanced Symptom Processing
 # -------------------------
+def build_symptom_automaton(lexicon):
+    """Aho-Corasick automaton mapping each lowercased canonical/synonym to its canonical symptoms"""
+    patterns = {}
+    for canonical, synonyms in lexicon.items():
+        for term in [canonical, *synonyms]:
+            if term:
+                patterns.setdefault(term.lower(), []).append(canonical)
+
+    automaton = ahocorasick.Automaton()
+    for term, canonicals in patterns.items():
+        automaton.add_word(term, tuple(canonicals))
+    automaton.make_automaton()
+    return automaton
+
+
+symptom_automaton = build_symptom_automaton(symptom_lexicon["symptom_lexicon"]) if ahocorasick else None
+
+
 def normalize_symptoms(user_text):
     """Traditional symptom normalization"""
-    normalized = []
     text = user_text.lower()
-    for canonical, synonyms in symptom_lexicon["symptom_lexicon"].items():
-        if canonical.lower() in text:
-            normalized.append(canonical)
-        else:
-            for syn in synonyms:
-                if syn.lower() in text:
-                    normalized.append(canonical)
-                    break
-    return list(set(normalized))
+    if symptom_automaton is not None:
+        # One linear pass over the text finds every lexicon term it contains;
+        # dict.fromkeys dedupes while keeping first-mention order
+        return list(dict.fromkeys(
+            canonical for _, canonicals in symptom_automaton.iter(text) for canonical in canonicals
+        ))
+
+    # Each canonical is visited once, so the result is already duplicate-free
+    return [
+        canonical for canonical, terms in SYMPTOM_LEXICON_LOWER
+        if any(term in text for term in terms)
+    ]
 
 def process_symptoms_with_ai(user_text, patient_context=None):
     """Process symptoms using AI if available, fallback to traditional method"""
@@ -275,53 +720,129 @@ def process_symptoms_traditional(user_text):
 # Check red flags
 # -------------------------
 def check_red_flags(symptoms):
-    for flag in red_flags["red_flags"]:
-        for trigger in flag["trigger_symptoms"]:
-            if any(trigger.lower() in s.lower() for s in symptoms):
-                return flag
+    # Newline-joined so a trigger can never match across two symptoms
+    joined = "\n".join(s.lower() for s in symptoms)
+    for flag, pattern in RED_FLAG_PATTERNS:
+        if pattern.search(joined):
+            return flag
     return None
 
 
 # -------------------------
 # Match condition
 # -------------------------
+# Inverted index: symptom -> indices of the conditions that list it
+sym_to_conds = defaultdict(list)
+for _i, _cond in enumerate(conditions["conditions"]):
+    for _sym in set(_cond["symptoms"]):
+        sym_to_conds[_sym].append(_i)
+sym_to_conds = dict(sym_to_conds)
+
+
 def match_condition(symptoms):
-    best_match = None
-    best_score = 0
-    for cond in conditions["conditions"]:
-        overlap = len(set(cond["symptoms"]).intersection(symptoms))
-        if overlap > best_score:
-            best_score = overlap
-            best_match = cond
-    return best_match
+    overlaps = Counter()
+    for sym in set(symptoms):
+        overlaps.update(sym_to_conds.get(sym, ()))
+    if not overlaps:
+        return None
+    # Highest overlap wins; ties go to the condition listed first
+    best_idx = min(overlaps, key=lambda i: (-overlaps[i], i))
+    return conditions["conditions"][best_idx]
 
 
 # -------------------------
 # Find nearest hospitals
 # -------------------------
-def find_hospitals(lat, lon, department):
-    matches = []
-    for hosp in hospitals:
-        try:
-            hosp_lat = float(hosp["location_lat"])
-            hosp_lon = float(hosp["location_lon"])
-            distance = haversine(float(lat), float(lon), hosp_lat, hosp_lon)
-
-            if department in hosp["departments_available"]:
-                matches.append(
-                    {
-                        "hospital": hosp["hospital_name"],
-                        "city": hosp["city"],
-                        "department": department,
-                        "contact": hosp["contact_number"],
-                        "distance_km": round(distance, 2),
-                    }
-                )
-        except Exception as e:
-            print("Error parsing hospital row:", e)
-            continue
+# Nearest-hospital candidates are cached on a 0.01 degree (~1 km) grid
+HOSPITAL_CACHE_SCALE = 100
+
+
+@lru_cache(maxsize=4096)
+def _nearest_hospital_rows(lat_key, lon_key, department, k):
+    """
+    Row indices (ascending) of every hospital in `department` that can be among
+    the k nearest to any point of a grid cell: those within the grid point's
+    k-th nearest distance plus twice the farthest a cell point lies from it.
+    Call _nearest_hospital_rows.cache_clear() (and those of _department_rows and
+    _department_tree) whenever the hospital arrays change.
+    """
+    idx = _department_rows(department)
+    k = min(k, idx.size)
+    if k == 0:
+        return ()
+
+    lat, lon = lat_key / HOSPITAL_CACHE_SCALE, lon_key / HOSPITAL_CACHE_SCALE
+    half = 0.5 / HOSPITAL_CACHE_SCALE
+    cell_radius = max(
+        haversine(lat, lon, lat + d_lat, lon + d_lon)
+        for d_lat in (-half, half) for d_lon in (-half, half)
+    )
+
+    tree = _department_tree(department)
+    if tree is not None:
+        # Chord length is monotonic in great-circle distance, so the tree's k
+        # nearest points are exactly the k nearest hospitals, and a ball query
+        # returns exactly the hospitals within a radius
+        lat_rad, lon_rad = math.radians(lat), math.radians(lon)
+        grid_xyz = (
+            math.cos(lat_rad) * math.cos(lon_rad),
+            math.cos(lat_rad) * math.sin(lon_rad),
+            math.sin(lat_rad),
+        )
+        _, nearest = tree.query(grid_xyz, k=k)
+        farthest = idx[np.atleast_1d(nearest)[-1]]
+        kth = haversine(lat, lon, hosp_lat[farthest], hosp_lon[farthest])
+        # Padded past float rounding in the chord and the Haversine distances
+        angle = min((kth + 2 * cell_radius + 1e-6) / EARTH_RADIUS_KM, math.pi)
+        rows = idx[tree.query_ball_point(grid_xyz, r=2 * math.sin(angle / 2))]
+    else:
+        distances = haversine_vector(lat, lon, hosp_lat_rad[idx], hosp_lon_rad[idx], cos_hosp_lat_rad[idx])
+        # Partial selection of the k-th nearest distance
+        kth = np.partition(distances, k - 1)[k - 1]
+        rows = idx[distances <= kth + 2 * cell_radius + 1e-6]
 
-    return sorted(matches, key=lambda x: x["distance_km"])[:3]
+    return tuple(sorted(int(row) for row in rows))
+
+
+def find_hospitals(lat, lon, department, k=3):
+    if not isinstance(department, str):
+        return []
+    lat, lon = float(lat), float(lon)
+    rows = _nearest_hospital_rows(
+        round(lat * HOSPITAL_CACHE_SCALE), round(lon * HOSPITAL_CACHE_SCALE), department, k
+    )
+    if not rows:
+        return []
+
+    # Exact distances from the user's own position over the cached candidates,
+    # then the k nearest of them (ties go to the earlier row)
+    rows = np.asarray(rows, dtype=np.intp)
+    k = min(k, rows.size)
+    if NUMBA_ENABLED:
+        lat_rad = math.radians(lat)
+        rows, distances = nearest_k(
+            lat_rad, math.radians(lon), math.cos(lat_rad),
+            rows, hosp_lat_rad, hosp_lon_rad, cos_hosp_lat_rad, k
+        )
+    else:
+        distances = haversine_vector(lat, lon, hosp_lat_rad[rows], hosp_lon_rad[rows], cos_hosp_lat_rad[rows])
+        order = np.argsort(distances, kind="stable")[:k]
+        rows, distances = rows[order], distances[order]
+
+    # Python objects are built only for the winners, one column gather each
+    return [
+        {
+            "hospital": name,
+            "city": city,
+            "department": department,
+            "contact": contact,
+            "distance_km": round(d, 2),
+        }
+        for name, city, contact, d in zip(
+            hosp_name[rows].tolist(), hosp_city[rows].tolist(),
+            hosp_contact[rows].tolist(), distances.tolist()
+        )
+    ]
 
 
 # -------------------------
@@ -331,7 +852,7 @@ def find_hospitals(lat, lon, department):
 def query():
     """Enhanced API endpoint with Professional Disease Prediction"""
     try:
-        data = request.json
+        data = _json_body()
         text = data.get("text", "")
         lat = float(data.get("lat", 0))
         lon = float(data.get("lon", 0))
@@ -379,6 +900,22 @@ def query():
                     # Get top prediction for primary department
                     top_prediction = prediction_result["predictions"][0]
                     department = top_prediction["department"]
+                    
+                    # Start the conversational AI call (if requested) so the LLM
+                    # round trip overlaps the hospital search
+                    ai_future = None
+                    if conversation_mode and AI_ENABLED:
+                        try:
+                            ai_context = {
+                                "symptoms": symptoms,
+                                "top_diagnosis": top_prediction["disease"],
+                                "probability": top_prediction["probability"],
+                                "urgency": top_prediction["severity"]
+                            }
+                            ai_future = io_pool.submit(get_ai_medical_advice, text, ai_context, chat_history)
+                        except Exception as e:
+                            print(f"AI conversation failed: {e}")
+                    
                     nearby = find_hospitals(lat, lon, department)
                     
                     # Build comprehensive response
@@ -415,16 +952,9 @@ def query():
                     }
                     
                     # Add conversational AI if requested
-                    if conversation_mode and AI_ENABLED:
+                    if ai_future is not None:
                         try:
-                            ai_context = {
-                                "symptoms": symptoms,
-                                "top_diagnosis": top_prediction["disease"],
-                                "probability": top_prediction["probability"],
-                                "urgency": top_prediction["severity"]
-                            }
-                            ai_advice = get_ai_medical_advice(text, ai_context, chat_history)
-                            response["ai_conversation"] = ai_advice
+                            response["ai_conversation"] = ai_future.result()
                         except Exception as e:
                             print(f"AI conversation failed: {e}")
                     
@@ -504,7 +1034,7 @@ def query():
 def conversation():
     """Dedicated endpoint for conversational AI with diet detection"""
     try:
-        data = request.json
+        data = _json_body()
         user_message = data.get("message", "")
         symptom_context = data.get("symptom_context", {})
         chat_history = data.get("chat_history", [])
@@ -563,7 +1093,7 @@ def conversation():
 def health_education():
     """Endpoint for health education content"""
     try:
-        data = request.json
+        data = _json_body()
         condition = data.get("condition", "")
         symptoms = data.get("symptoms", [])
         
@@ -590,7 +1120,7 @@ def health_education():
 def diet_recommendations():
     """Endpoint for personalized diet recommendations based on diagnosed condition"""
     try:
-        data = request.json
+        data = _json_body()
         condition = data.get("condition", "")
         patient_context = data.get("patient_context", {})
         
@@ -620,9 +1150,15 @@ def voice_input():
         if audio_file.filename == '':
             return jsonify({"error": "No audio file selected"}), 400
         
-        # Process voice input
-        audio_data = audio_file.read()
-        result = process_voice_input(audio_data)
+        if not _upload_slots.acquire(blocking=False):
+            return jsonify({"error": "Voice processing is busy, please retry shortly"}), 503
+        try:
+            # Process voice input
+            audio_data = audio_file.read()
+            process_voice_input, _ = _voice()
+            result = process_voice_input(audio_data)
+        finally:
+            _upload_slots.release()
         
         if result['success']:
             return jsonify({
@@ -643,13 +1179,14 @@ def voice_response():
         if not VOICE_ENABLED:
             return jsonify({"error": "Voice processing not available"}), 503
         
-        data = request.json
+        data = _json_body()
         diagnosis_result = data.get("diagnosis_result", {})
         
         if not diagnosis_result:
             return jsonify({"error": "No diagnosis result provided"}), 400
         
         # Generate voice response
+        _, generate_voice_response = _voice()
         result = generate_voice_response(diagnosis_result)
         
         if result['success']:
@@ -678,11 +1215,16 @@ def scan_report():
         if report_file.filename == '':
             return jsonify({"error": "No report file selected"}), 400
         
-        # Process the report
-        file_data = report_file.read()
-        filename = report_file.filename
-        
-        result = scan_medical_report(file_data, filename)
+        if not _upload_slots.acquire(blocking=False):
+            return jsonify({"error": "Report scanning is busy, please retry shortly"}), 503
+        try:
+            # Process the report
+            file_data = report_file.read()
+            filename = report_file.filename
+            
+            result = _report_scanner()(file_data, filename)
+        finally:
+            _upload_slots.release()
         
         if result['success']:
             return jsonify({
@@ -698,34 +1240,62 @@ def scan_report():
     except Exception as e:
         return jsonify({"error": f"Report scanning error: {str(e)}"}), 500
 
-@app.route("/api/status", methods=["GET"])
+# Feature flags are fixed at import, so the status body is serialized only once
+STATUS = {
+    "status": "online",
+    "ai_enabled": AI_ENABLED,
+    "voice_enabled": VOICE_ENABLED,
+    "report_scan_enabled": REPORT_SCAN_ENABLED,
+    "medicine_enabled": MEDICINE_ENABLED,
+    "version": "3.0.0",
+    "features": {
+        "ai_symptom_parsing": AI_ENABLED,
+        "ai_triage": AI_ENABLED,
+        "conversational_ai": AI_ENABLED,
+        "health_education": AI_ENABLED,
+        "voice_input": VOICE_ENABLED,
+        "voice_output": VOICE_ENABLED,
+        "report_scanning": REPORT_SCAN_ENABLED,
+        "medicine_recommendations": MEDICINE_ENABLED,
+        "traditional_fallback": True
+    }
+}
+STATUS_BODY = (
+    orjson.dumps(STATUS, option=orjson.OPT_SORT_KEYS) if orjson
+    else json.dumps(STATUS, sort_keys=True, separators=(",", ":")).encode()
+)
+
 @app.route('/api/status', methods=['GET'])
 def status():
     """API status endpoint"""
-    return jsonify({
-        "status": "online",
-        "ai_enabled": AI_ENABLED,
-        "voice_enabled": VOICE_ENABLED,
-        "report_scan_enabled": REPORT_SCAN_ENABLED,
-        "medicine_enabled": MEDICINE_ENABLED,
-        "version": "3.0.0",
-        "features": {
-            "ai_symptom_parsing": AI_ENABLED,
-            "ai_triage": AI_ENABLED,
-            "conversational_ai": AI_ENABLED,
-            "health_education": AI_ENABLED,
-            "voice_input": VOICE_ENABLED,
-            "voice_output": VOICE_ENABLED,
-            "report_scanning": REPORT_SCAN_ENABLED,
-            "medicine_recommendations": MEDICINE_ENABLED,
-            "traditional_fallback": True
-        }
-    })
+    return Response(STATUS_BODY, mimetype="application/json")
 
 # ===============================
 # MEDICINE RECOMMENDATION ENDPOINTS
 # ===============================
 
+# Concurrent recommendation/search requests can be coalesced into one batch per
+# short window (MEDICINE_BATCH_WAIT_MS > 0), so identical queries are computed
+# once. Off by default: the lookups are in-memory, so with nothing to amortize
+# the window would only add latency and serialize requests on one thread.
+MEDICINE_BATCH_WAIT_MS = float(os.getenv('MEDICINE_BATCH_WAIT_MS', 0))
+MEDICINE_BATCH_SIZE = int(os.getenv('MEDICINE_BATCH_SIZE', 32))
+
+medicine_recommendation_batcher = medicine_search_batcher = None
+if MEDICINE_ENABLED and MEDICINE_BATCH_WAIT_MS > 0:
+    medicine_recommendation_batcher = RequestBatcher(
+        get_medicine_recommendations_batch, MEDICINE_BATCH_SIZE, MEDICINE_BATCH_WAIT_MS
+    )
+    medicine_search_batcher = RequestBatcher(
+        search_medicines_by_symptoms_batch, MEDICINE_BATCH_SIZE, MEDICINE_BATCH_WAIT_MS
+    )
+
+
+def _batch_key(payload):
+    """Hashable dedup key for a JSON-like batch payload"""
+    return json.dumps(payload, sort_keys=True, default=str)
+
+
 @app.route('/api/medicine/recommendations', methods=['POST'])
 def get_medicine_recommendations():
     """Get medicine recommendations for a diagnosed condition"""
@@ -736,7 +1306,7 @@ def get_medicine_recommendations():
         }), 503
     
     try:
-        data = request.json
+        data = _json_body()
         condition = data.get('condition', '').strip()
         
         if not condition:
@@ -754,8 +1324,18 @@ def get_medicine_recommendations():
             "urgency": data.get('urgency', 'normal')
         }
         
-        # Get medicine recommendations
-        recommendations = get_medicine_recommendations_for_condition(condition, patient_context)
+        # Get medicine recommendations (cached per condition + patient context)
+        payload = (condition, patient_context)
+        key = _batch_key(payload)
+        cache_key = 'medrec:' + hashlib.sha1(key.encode()).hexdigest()
+        recommendations = cache.get(cache_key) if cache else None
+        if recommendations is None:
+            if medicine_recommendation_batcher:
+                recommendations = medicine_recommendation_batcher.submit(key, payload)
+            else:
+                recommendations = get_medicine_recommendations_for_condition(condition, patient_context)
+            if cache and recommendations.get('success'):
+                cache.set(cache_key, recommendations, timeout=600)
         
         return jsonify(recommendations)
         
@@ -766,6 +1346,7 @@ def get_medicine_recommendations():
         }), 500
 
 @app.route('/api/medicine/details/<medicine_name>', methods=['GET'])
+@cache_ok_responses(timeout=3600)
 def get_medicine_information(medicine_name):
     """Get detailed information about a specific medicine"""
     if not MEDICINE_ENABLED:
@@ -794,7 +1375,7 @@ def search_medicines():
         }), 503
     
     try:
-        data = request.json
+        data = _json_body()
         symptoms = data.get('symptoms', [])
         
         if not symptoms:
@@ -804,7 +1385,10 @@ def search_medicines():
             }), 400
         
         # Search medicines by symptoms
-        search_results = search_medicines_by_symptoms(symptoms)
+        if medicine_search_batcher:
+            search_results = medicine_search_batcher.submit(_batch_key(symptoms), symptoms)
+        else:
+            search_results = search_medicines_by_symptoms(symptoms)
         
         return jsonify(search_results)
         
@@ -818,17 +1402,21 @@ def search_medicines():
 def analyze_with_medicine_recommendations():
     """Complete analysis with diagnosis and medicine recommendations"""
     try:
-        data = request.json
-        symptoms = data.get('symptoms', [])
-        location = data.get('location', '')
-        lat = data.get('lat')
-        lon = data.get('lon')
-        age = data.get('age')
-        gender = data.get('gender', 'other')
+        try:
+            req = _parse_body(AnalyzeRequest)
+        except REQUEST_DECODE_ERRORS as e:
+            return jsonify({
+                "success": False,
+                "error": f"Invalid request body: {str(e)}"
+            }), 400
+        symptoms = req.symptoms
+        location = req.location
+        lat = req.lat
+        lon = req.lon
+        age = req.age
+        gender = req.gender
         
-        print(f"\n=== ANALYZE REQUEST ===")
-        print(f"Symptoms received: {symptoms}")
-        print(f"Location: {location}")
+        logger.debug("Analyze request: symptoms=%s location=%s", symptoms, location)
         
         if not symptoms:
             return jsonify({
@@ -842,10 +1430,10 @@ def analyze_with_medicine_recommendations():
         if AI_ENABLED:
             # Parse symptoms with AI
             symptom_text = ' '.join(symptoms) if isinstance(symptoms, list) else symptoms
-            print(f"Processing symptom text: {symptom_text}")
+            logger.debug("Processing symptom text: %s", symptom_text)
             
             parsed_result = parse_symptoms_with_ai(symptom_text)
-            print(f"Parsed result: {parsed_result}")
+            logger.debug("Parsed result: %s", parsed_result)
             
             # Extract just the symptom list from the parsed result
             if isinstance(parsed_result, dict) and 'symptoms' in parsed_result:
@@ -853,7 +1441,7 @@ def analyze_with_medicine_recommendations():
             else:
                 parsed_symptoms = parsed_result
             
-            print(f"Extracted symptoms list: {parsed_symptoms}")
+            logger.debug("Extracted symptoms list: %s", parsed_symptoms)
             
             # Perform AI triage
             triage_result = perform_ai_triage(parsed_symptoms, {
@@ -861,7 +1449,7 @@ def analyze_with_medicine_recommendations():
                 "gender": gender,
                 "location": location
             })
-            print(f"Triage result: {triage_result}")
+            logger.debug("Triage result: %s", triage_result)
             
             analysis_result = {
                 "symptoms": parsed_symptoms,
@@ -875,7 +1463,7 @@ def analyze_with_medicine_recommendations():
             
             # If no conditions found, try traditional matching
             if not potential_conditions or len(potential_conditions) == 0:
-                print("No AI conditions found, trying traditional matching...")
+                logger.debug("No AI conditions found, trying traditional matching")
                 # Normalize and match symptoms traditionally
                 normalized_symptoms = normalize_symptoms(symptom_text)
                 traditional_condition = match_condition(normalized_symptoms)
@@ -883,9 +1471,9 @@ def analyze_with_medicine_recommendations():
                     potential_conditions = [traditional_condition.get('condition', 'General symptom relief')]
                     triage_result['potential_conditions'] = potential_conditions
                     triage_result['department'] = traditional_condition.get('department', 'General Medicine')
-                    print(f"Traditional match found: {potential_conditions}")
+                    logger.debug("Traditional match found: %s", potential_conditions)
             
-            print(f"Potential conditions: {potential_conditions}")
+            logger.debug("Potential conditions: %s", potential_conditions)
             
         else:
             # Fallback to traditional analysis
@@ -896,20 +1484,19 @@ def analyze_with_medicine_recommendations():
             }
             potential_conditions = ["General symptom relief"]
         
-        # Get medicine recommendations for top conditions
-        medicine_recommendations = {}
+        # Get medicine recommendations for top conditions (top 3, resolved in one
+        # batch) in the background while the hospital search runs
+        medicine_future = None
         if MEDICINE_ENABLED and potential_conditions:
             patient_context = {
                 "age": age,
-                "pregnant": data.get('pregnant', False),
-                "allergies": data.get('allergies', []),
+                "pregnant": req.pregnant,
+                "allergies": req.allergies,
                 "urgency": analysis_result.get('triage', {}).get('urgency', 'normal')
             }
-            
-            for condition in potential_conditions[:3]:  # Top 3 conditions
-                recommendations = get_medicine_recommendations_for_condition(condition, patient_context)
-                if recommendations.get('success') and recommendations.get('recommendations'):
-                    medicine_recommendations[condition] = recommendations
+            medicine_future = io_pool.submit(
+                get_medicine_recommendations_for_conditions, potential_conditions[:3], patient_context
+            )
         
         # Find nearby hospitals
         nearby_hospitals = []
@@ -921,12 +1508,18 @@ def analyze_with_medicine_recommendations():
             
             nearby_hospitals = find_hospitals(lat, lon, department)
         
+        medicine_recommendations = {}
+        if medicine_future is not None:
+            for condition, recommendations in medicine_future.result().items():
+                if recommendations.get('success') and recommendations.get('recommendations'):
+                    medicine_recommendations[condition] = recommendations
+        
         return jsonify({
             "success": True,
             "analysis": analysis_result,
             "medicine_recommendations": medicine_recommendations,
             "hospitals": nearby_hospitals,
-            "timestamp": str(data.get('timestamp', '')),
+            "timestamp": str(req.timestamp),
             "comprehensive_analysis": True
         })
         
@@ -943,7 +1536,7 @@ def analyze_with_medicine_recommendations():
 def find_nearby_hospitals_live():
     """Find hospitals near user's live location - MAIN PROJECT FEATURE"""
     try:
-        data = request.get_json()
+        data = _json_body()
         
         # Extract location from request
         user_lat = data.get('latitude')
@@ -1027,7 +1620,7 @@ def find_nearby_hospitals_live():
 def find_hospitals_by_city():
     """Find hospitals in a specific city"""
     try:
-        data = request.get_json()
+        data = _json_body()
         city_name = data.get('city', '').title()
         department = data.get('department', None)
         limit = data.get('limit', 10)
@@ -1080,6 +1673,7 @@ def find_hospitals_by_city():
         }), 500
 
 if __name__ == '__main__':
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper())
     print("\n🏥 Smart Symptom Checker v3.0 with Medicine Recommendations & Hospital Finder")
     print("=" * 60)
     print(f"AI Features: {'✅ Enabled (Fallback)' if not AI_ENABLED else '✅ Enabled (Full)'}")
@@ -1090,5 +1684,8 @@ if __name__ == '__main__':
     print("=" * 60)
     print("💡 Note: Fallback modes provide basic functionality without heavy dependencies")
     print("=" * 60)
-    print("🚀 Starting server...")
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    print("🚀 Starting server... (production: gunicorn -c backend/gunicorn.conf.py)")
+    # Threaded so concurrent requests overlap on DB/LLM I/O. Debug (and its
+    # reloader, which imports every model twice) is opt-in via FLASK_DEBUG=1.
+    debug = os.getenv('FLASK_DEBUG') == '1'
+    app.run(debug=debug, host='0.0.0.0', port=5000, threaded=True, use_reloader=debug)
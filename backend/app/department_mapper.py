@@ -1,20 +1,23 @@
 
 import json
+from functools import lru_cache
 
 # Load department map
 with open("./data/department_map.json") as f:
     department_map = json.load(f)["department_map"]
 
+# Keyed by lowercased condition name; the first spelling in the file wins
+_dept_lookup = {}
+for cond, dept in department_map.items():
+    _dept_lookup.setdefault(cond.lower(), dept)
+
+@lru_cache(maxsize=1024)
 def get_department(condition_name: str) -> str:
     """
     Return department for a given condition.
     Falls back to 'General Medicine' if not found.
     """
-    condition_name = condition_name.lower()
-    for cond, dept in department_map.items():
-        if cond.lower() == condition_name:
-            return dept
-    return "General Medicine"
+    return _dept_lookup.get(condition_name.lower(), "General Medicine")
 
 if __name__ == "__main__":
     # Quick test
@@ -1,11 +1,110 @@
 # disease_predictor.py - Professional-grade disease prediction with probability scoring
+import heapq
 import json
-import csv
+import logging
+import mmap
+import pickle
+import re
+import sys
+import threading
 import numpy as np
+from bisect import bisect_right
 from collections import defaultdict
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import os
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from numba import njit
+    NUMBA_ENABLED = True
+except ImportError:
+    NUMBA_ENABLED = False
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on each per-input memo below; symptom wording is highly repetitive,
+# so the cap only matters for adversarial input and keeps memory bounded
+MATCH_CACHE_SIZE = 8192
+
+_project_root = os.path.join(os.path.dirname(__file__), "..", "..")
+DISEASE_KB_PATH = os.path.join(_project_root, "config", "disease_knowledge_base.json")
+SYMPTOM_MAPPING_PATH = os.path.join(_project_root, "data", "comprehensive_symptom_disease_mapping.csv")
+
+# Values for optional mapping columns absent from the CSV
+MAPPING_DEFAULTS = {
+    'secondary_symptoms': '',
+    'department': 'General Medicine',
+    'severity': 'GP',
+    'description': '',
+    'common_age_group': 'All ages',
+    'prevalence': 'Common',
+}
+
+# Snapshot of everything built from the two files above, reused while they are
+# unchanged so worker start-up skips parsing and index building
+SNAPSHOT_PATH = os.path.join(_project_root, "config", "disease_predictor.pkl")
+# Bump when the layout of SNAPSHOT_ATTRS changes so older snapshots are rebuilt
+SNAPSHOT_VERSION = 3
+SNAPSHOT_ATTRS = (
+    "disease_knowledge", "diseases", "symptom_disease_map",
+    "_known_symptoms", "_known_symptoms_set", "_known_symptom_words",
+    "_symptom_automaton", "_joined_symptoms", "_joined_starts", "_word_to_symptoms",
+)
+
+
+if NUMBA_ENABLED:
+    @njit(cache=True)
+    def _accumulate(scores, disease_idx, weights, confidence, severity):
+        """Add one matched symptom's weighted contribution to each linked disease's score"""
+        for i in range(disease_idx.shape[0]):
+            scores[disease_idx[i]] += weights[i] * confidence * severity
+
+    # Compile once at import instead of on the first prediction
+    _accumulate(np.zeros(1), np.zeros(1, dtype=np.intp), np.ones(1), 1.0, 1.0)
+else:
+    def _accumulate(scores, disease_idx, weights, confidence, severity):
+        """Add one matched symptom's weighted contribution to each linked disease's score"""
+        np.add.at(scores, disease_idx, weights * confidence * severity)
+
+
+def _phrase_automaton(phrases: List[str]):
+    """Aho-Corasick automaton mapping each phrase to its index, or None without pyahocorasick"""
+    if ahocorasick is None or not phrases:
+        return None
+    automaton = ahocorasick.Automaton()
+    for i, phrase in enumerate(phrases):
+        automaton.add_word(phrase, i)
+    automaton.make_automaton()
+    return automaton
+
+
+def _phrases_in(text: str, phrases: List[str], automaton) -> List[int]:
+    """Indices (ascending) of the phrases occurring in `text`, each reported once"""
+    if automaton is not None:
+        return sorted({i for _, i in automaton.iter(text)})
+    return [i for i, phrase in enumerate(phrases) if phrase in text]
+
+
+def _source_stamp():
+    """Snapshot version, (size, mtime) of each source file and whether automata are in use; None if a file is missing"""
+    try:
+        files = tuple(
+            (os.stat(path).st_size, os.stat(path).st_mtime_ns)
+            for path in (DISEASE_KB_PATH, SYMPTOM_MAPPING_PATH)
+        )
+    except OSError:
+        return None
+    return SNAPSHOT_VERSION, files, ahocorasick is not None
+
 class ProfessionalDiseasePredictor:
     """
     Advanced disease prediction system that provides:
@@ -22,10 +121,17 @@ class ProfessionalDiseasePredictor:
         self.symptom_disease_map = defaultdict(list)
         self.symptom_weights = {}
         
+        # Memoized per-input results; the known-symptom index never changes after
+        # loading, so entries never need invalidating
+        self._fuzzy_cache = {}
+        self._severity_cache = {}
+        
         # Load medical databases
-        self._load_disease_knowledge_base()
-        self._load_symptom_disease_mapping()
-        self._build_symptom_index()
+        if not self._load_snapshot():
+            self._load_disease_knowledge_base()
+            self._load_symptom_disease_mapping()
+            self._build_symptom_index()
+            self._save_snapshot()
         
         # Define symptom severity multipliers
         self.severity_multipliers = {
@@ -36,6 +142,11 @@ class ProfessionalDiseasePredictor:
             "extreme": 1.6,
             "unbearable": 1.7
         }
+        # Every severity word in a text in one scan; the lookahead reports matches at
+        # every position, so words overlapping each other are all still found
+        self._severity_re = re.compile(
+            "(?=(" + "|".join(map(re.escape, self.severity_multipliers)) + "))"
+        )
         
         # Disease prevalence multipliers (more common = higher multiplier)
         self.prevalence_multipliers = {
@@ -70,6 +181,7 @@ class ProfessionalDiseasePredictor:
             "41-60": ["Hypertension", "Type 2 Diabetes", "Rheumatoid Arthritis", "Gout"],
             "61+": ["Hypertension", "Type 2 Diabetes", "Heart Failure", "Stroke", "Alzheimer's Disease", "Osteoporosis"]
         }
+        self.age_risk_factors = {group: frozenset(names) for group, names in self.age_risk_factors.items()}
         
         # Critical symptom indicators (increase probability significantly)
         self.critical_symptoms = {
@@ -87,81 +199,221 @@ class ProfessionalDiseasePredictor:
             "severe abdominal pain": ["Appendicitis", "Gallstones"],
             "jaundice": ["Hepatitis", "Cirrhosis", "Gallstones"]
         }
+        
+        # Chronic conditions and the diseases they make more likely
+        self.chronic_disease_boost = {
+            "diabetes": ["Type 2 Diabetes", "Type 1 Diabetes", "Chronic Kidney Disease", "Heart Attack", "Stroke"],
+            "hypertension": ["Hypertension", "Heart Attack", "Stroke", "Chronic Kidney Disease", "Heart Failure"],
+            "high blood pressure": ["Hypertension", "Heart Attack", "Stroke", "Chronic Kidney Disease"],
+            "asthma": ["Asthma", "COPD", "Bronchitis", "Pneumonia"],
+            "heart disease": ["Heart Attack", "Angina", "Heart Failure", "Arrhythmia"],
+            "kidney": ["Chronic Kidney Disease", "Kidney Stones", "UTI"],
+            "thyroid": ["Hyperthyroidism", "Hypothyroidism"],
+            "arthritis": ["Rheumatoid Arthritis", "Osteoarthritis", "Gout"],
+        }
+        
+        # Advice shown for each severity level of the top prediction
+        self.urgency_map = {
+            "emergency": "IMMEDIATE MEDICAL ATTENTION REQUIRED",
+            "urgent": "Seek medical care within 24 hours",
+            "GP": "Schedule appointment with primary care physician",
+            "self-care": "Monitor symptoms, self-care measures may be sufficient"
+        }
+        
+        self._build_disease_arrays()
+    
+    def _disease_idx(self, disease_names: List[str]) -> np.ndarray:
+        """Ids of the listed diseases that exist in the mapping (unknown names are dropped)"""
+        return np.asarray([self.disease_ids[name] for name in disease_names if name in self.disease_ids], dtype=np.intp)
+    
+    def _build_disease_arrays(self):
+        """
+        Give every disease an integer id and lay per-disease data out as arrays
+        indexed by it, so predict_diseases scores all diseases with vector ops
+        """
+        self.disease_names = list(self.diseases)
+        self.disease_ids = {name: i for i, name in enumerate(self.disease_names)}
+        
+        # Matched symptom -> (disease ids, weights) of its links, in link order
+        self.symptom_to_disease_idx = {}
+        self.symptom_to_weight = {}
+        for symptom, links in self.symptom_disease_map.items():
+            self.symptom_to_disease_idx[symptom] = np.asarray([link[0] for link in links], dtype=np.intp)
+            self.symptom_to_weight[symptom] = np.asarray([link[1] for link in links], dtype=np.float64)
+        
+        self.prevalence_mult_arr = np.asarray([
+            self.prevalence_multipliers.get(d.get('prevalence', 'Common'), 1.0) for d in self.diseases.values()
+        ], dtype=np.float64)
+        
+        self.age_mult_arr = {}
+        for age_group, age_diseases in self.age_risk_factors.items():
+            mult = np.ones(len(self.disease_names))
+            mult[self._disease_idx(age_diseases)] = 1.2
+            self.age_mult_arr[age_group] = mult
+        
+        # Phrase tables matched with one automaton pass per text; the automata
+        # yield indices into the matching (phrase, disease ids) lists
+        self._critical_phrases = [k.lower() for k in self.critical_symptoms]
+        self._critical_idx = [self._disease_idx(v) for v in self.critical_symptoms.values()]
+        self._critical_automaton = _phrase_automaton(self._critical_phrases)
+        
+        self._pattern_idx = [(frozenset(pattern), self._disease_idx(boosted)) for pattern, boosted in self.common_patterns.items()]
+        # Pattern term -> ids of the patterns using it, to test only patterns with a term present
+        self._pattern_token_index = defaultdict(list)
+        for pattern_id, pattern in enumerate(self.common_patterns):
+            for term in dict.fromkeys(pattern):
+                self._pattern_token_index[term].append(pattern_id)
+        
+        self._chronic_keywords = list(self.chronic_disease_boost)
+        self._chronic_idx = [self._disease_idx(related) for related in self.chronic_disease_boost.values()]
+        self._chronic_automaton = _phrase_automaton(self._chronic_keywords)
+    
+    def _load_snapshot(self) -> bool:
+        """Restore the loaded data and symptom indexes from SNAPSHOT_PATH if it is current"""
+        stamp = _source_stamp()
+        if stamp is None or not os.path.exists(SNAPSHOT_PATH):
+            return False
+        try:
+            with open(SNAPSHOT_PATH, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    snapshot = pickle.loads(mm)
+        except Exception as e:
+            logger.warning("Ignoring unreadable predictor snapshot: %s", e)
+            return False
+        # Also rebuild snapshots written by a version that stored other attributes
+        if snapshot.get("stamp") != stamp or any(attr not in snapshot for attr in SNAPSHOT_ATTRS):
+            return False
+        for attr in SNAPSHOT_ATTRS:
+            setattr(self, attr, snapshot[attr])
+        logger.info("Loaded %s conditions and symptom index from snapshot", len(self.diseases))
+        return True
+    
+    def _save_snapshot(self):
+        """Write the loaded data and symptom indexes to SNAPSHOT_PATH"""
+        stamp = _source_stamp()
+        if stamp is None:
+            return
+        snapshot = {attr: getattr(self, attr) for attr in SNAPSHOT_ATTRS}
+        snapshot["stamp"] = stamp
+        try:
+            tmp_path = f"{SNAPSHOT_PATH}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, SNAPSHOT_PATH)
+        except OSError as e:
+            logger.warning("Could not write predictor snapshot: %s", e)
     
     def _load_disease_knowledge_base(self):
         """Load disease information from JSON knowledge base"""
         try:
-            config_path = os.path.join(os.path.dirname(__file__), "..", "..", "config", "disease_knowledge_base.json")
-            with open(config_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.disease_knowledge = data.get("disease_database", {})
-                print(f"✅ Loaded {len(self.disease_knowledge)} diseases from knowledge base")
+            with open(DISEASE_KB_PATH, 'rb') as f:
+                raw = f.read()
+            data = orjson.loads(raw) if orjson else json.loads(raw)
+            self.disease_knowledge = data.get("disease_database", {})
+            logger.info("Loaded %s diseases from knowledge base", len(self.disease_knowledge))
         except Exception as e:
-            print(f"⚠️ Could not load disease knowledge base: {e}")
+            logger.warning("Could not load disease knowledge base: %s", e)
             self.disease_knowledge = {}
     
     def _load_symptom_disease_mapping(self):
         """Load comprehensive symptom-disease mapping from CSV"""
+        # Only needed when the snapshot is stale, so pandas stays off the warm start path
+        import pandas as pd
+        
         try:
-            csv_path = os.path.join(os.path.dirname(__file__), "..", "..", "data", "comprehensive_symptom_disease_mapping.csv")
-            with open(csv_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    condition = row['condition']
-                    
-                    # Parse primary symptoms
-                    primary_symptoms = [s.strip() for s in row['primary_symptoms'].split(',')]
-                    # Parse secondary symptoms
-                    secondary_symptoms = [s.strip() for s in row.get('secondary_symptoms', '').split(',') if s.strip()]
-                    
-                    self.diseases[condition] = {
-                        'name': condition,
-                        'primary_symptoms': primary_symptoms,
-                        'secondary_symptoms': secondary_symptoms,
-                        'all_symptoms': primary_symptoms + secondary_symptoms,
-                        'department': row.get('department', 'General Medicine'),
-                        'severity': row.get('severity', 'GP'),
-                        'description': row.get('description', ''),
-                        'age_group': row.get('common_age_group', 'All ages'),
-                        'prevalence': row.get('prevalence', 'Common')
-                    }
-                    
-                print(f"✅ Loaded {len(self.diseases)} conditions from CSV mapping")
+            df = pd.read_csv(SYMPTOM_MAPPING_PATH, dtype=str, keep_default_na=False, encoding='utf-8')
+            for column, default in MAPPING_DEFAULTS.items():
+                if column not in df.columns:
+                    df[column] = default
+            
+            # Split every row's symptom list in one vectorized pass each
+            primary_lists = df['primary_symptoms'].str.strip().str.split(r'\s*,\s*', regex=True)
+            secondary_lists = df['secondary_symptoms'].str.strip().str.split(r'\s*,\s*', regex=True)
+            
+            rows = zip(
+                df['condition'], primary_lists, secondary_lists, df['department'],
+                df['severity'], df['description'], df['common_age_group'], df['prevalence']
+            )
+            for condition, primary_symptoms, secondary_symptoms, department, severity, description, age_group, prevalence in rows:
+                # Interned so a symptom or condition repeated across rows (and the
+                # index keys built from them) is one shared string object
+                condition = sys.intern(condition)
+                primary_symptoms = [sys.intern(s) for s in primary_symptoms]
+                secondary_symptoms = [sys.intern(s) for s in secondary_symptoms if s]
+                
+                self.diseases[condition] = {
+                    'name': condition,
+                    'primary_symptoms': primary_symptoms,
+                    'secondary_symptoms': secondary_symptoms,
+                    'all_symptoms': primary_symptoms + secondary_symptoms,
+                    'n_primary': len(primary_symptoms),
+                    'n_secondary': len(secondary_symptoms),
+                    'department': department,
+                    'severity': severity,
+                    'description': description,
+                    'age_group': age_group,
+                    'prevalence': prevalence
+                }
+            
+            logger.info("Loaded %s conditions from CSV mapping", len(self.diseases))
         except Exception as e:
-            print(f"⚠️ Could not load symptom-disease mapping: {e}")
+            logger.warning("Could not load symptom-disease mapping: %s", e)
     
     def _build_symptom_index(self):
-        """Build reverse index: symptom -> list of diseases"""
-        for disease_name, disease_info in self.diseases.items():
+        """Build reverse index: symptom -> list of (disease id, weight, is_primary) links"""
+        # Disease ids are positions in self.diseases (see _build_disease_arrays)
+        for disease_id, disease_info in enumerate(self.diseases.values()):
             # Primary symptoms get higher weight
             for symptom in disease_info['primary_symptoms']:
-                symptom_lower = symptom.lower()
-                self.symptom_disease_map[symptom_lower].append({
-                    'disease': disease_name,
-                    'weight': 2.0,  # Primary symptoms are more important
-                    'type': 'primary'
-                })
+                symptom_lower = sys.intern(symptom.lower())
+                self.symptom_disease_map[symptom_lower].append((disease_id, 2.0, True))
             
             # Secondary symptoms get lower weight
             for symptom in disease_info['secondary_symptoms']:
-                symptom_lower = symptom.lower()
-                self.symptom_disease_map[symptom_lower].append({
-                    'disease': disease_name,
-                    'weight': 1.0,  # Secondary symptoms
-                    'type': 'secondary'
-                })
-        
-        print(f"✅ Built symptom index with {len(self.symptom_disease_map)} unique symptoms")
+                symptom_lower = sys.intern(symptom.lower())
+                self.symptom_disease_map[symptom_lower].append((disease_id, 1.0, False))
+        
+        # Matching indexes over the known symptoms (keys are already lowercase).
+        # Position in _known_symptoms is the scan order the matcher's ties follow.
+        self._known_symptoms = list(self.symptom_disease_map)
+        self._known_symptoms_set = frozenset(self._known_symptoms)
+        self._known_symptom_words = [frozenset(map(sys.intern, known.split())) for known in self._known_symptoms]
+        
+        # Known symptoms contained in the input: one Aho-Corasick pass over the input
+        self._symptom_automaton = None
+        if ahocorasick is not None and self._known_symptoms:
+            self._symptom_automaton = ahocorasick.Automaton()
+            for i, known in enumerate(self._known_symptoms):
+                self._symptom_automaton.add_word(known, i)
+            self._symptom_automaton.make_automaton()
+        
+        # Known symptoms containing the input: one str.find over all of them joined
+        self._joined_symptoms = "\0".join(self._known_symptoms)
+        self._joined_starts = []
+        offset = 0
+        for known in self._known_symptoms:
+            self._joined_starts.append(offset)
+            offset += len(known) + 1
+        
+        # Word -> indices of the known symptoms containing it, for the overlap fallback
+        self._word_to_symptoms = defaultdict(set)
+        for i, known_words in enumerate(self._known_symptom_words):
+            for word in known_words:
+                self._word_to_symptoms[word].add(i)
+        
+        logger.info("Built symptom index with %s unique symptoms", len(self.symptom_disease_map))
     
     def _extract_severity_from_text(self, text: str) -> float:
         """Extract severity multiplier from symptom description"""
-        text_lower = text.lower()
-        multiplier = 1.0
+        multiplier = self._severity_cache.get(text)
+        if multiplier is not None:
+            return multiplier
         
-        for severity_word, mult in self.severity_multipliers.items():
-            if severity_word in text_lower:
-                multiplier = max(multiplier, mult)
+        # Milder words never lower the multiplier below 1.0
+        multiplier = max([1.0] + [self.severity_multipliers[word] for word in self._severity_re.findall(text.lower())])
         
+        if len(self._severity_cache) < MATCH_CACHE_SIZE:
+            self._severity_cache[text] = multiplier
         return multiplier
     
     def _get_age_group(self, age: int) -> str:
@@ -177,41 +429,67 @@ class ProfessionalDiseasePredictor:
         else:
             return "61+"
     
-    def _fuzzy_symptom_match(self, input_symptom: str, symptom_list: List[str]) -> Tuple[str, float]:
+    def _first_symptom_containing(self, text: str) -> Optional[int]:
+        """Index of the first known symptom that contains `text`, or None"""
+        pos = self._joined_symptoms.find(text)
+        while pos != -1:
+            i = bisect_right(self._joined_starts, pos) - 1
+            if pos + len(text) <= self._joined_starts[i] + len(self._known_symptoms[i]):
+                return i
+            pos = self._joined_symptoms.find(text, pos + 1)
+        return None
+    
+    def _first_symptom_contained_in(self, text: str) -> Optional[int]:
+        """Index of the first known symptom that occurs inside `text`, or None"""
+        if self._symptom_automaton is not None:
+            return min((i for _, i in self._symptom_automaton.iter(text)), default=None)
+        return next((i for i, known in enumerate(self._known_symptoms) if known in text), None)
+    
+    def _fuzzy_symptom_match(self, input_symptom: str) -> Tuple[str, float]:
         """
         Fuzzy match input symptom against known symptoms
         Returns: (matched_symptom, confidence_score)
         """
-        input_lower = input_symptom.lower()
+        hit = self._fuzzy_cache.get(input_symptom)
+        if hit is not None:
+            return hit
+        
+        result = self._match_symptom(input_symptom.lower())
+        if len(self._fuzzy_cache) < MATCH_CACHE_SIZE:
+            self._fuzzy_cache[input_symptom] = result
+        return result
+    
+    def _match_symptom(self, input_lower: str) -> Tuple[str, float]:
+        """Uncached body of _fuzzy_symptom_match for an already lowercased input"""
+        # Exact match
+        if input_lower in self._known_symptoms_set:
+            return input_lower, 1.0
+        
+        # Substring match (either direction); the earliest known symptom wins
+        candidates = [
+            i for i in (self._first_symptom_containing(input_lower), self._first_symptom_contained_in(input_lower))
+            if i is not None
+        ]
+        if candidates:
+            return self._known_symptoms[min(candidates)], 0.9
+        
+        # Word overlap, only against known symptoms sharing at least one word
         input_words = set(input_lower.split())
-        
         best_match = None
         best_score = 0.0
         
-        for known_symptom in symptom_list:
-            known_lower = known_symptom.lower()
-            known_words = set(known_lower.split())
-            
-            # Exact match
-            if input_lower == known_lower:
-                return known_symptom, 1.0
-            
-            # Substring match
-            if input_lower in known_lower or known_lower in input_lower:
-                score = 0.9
-                if score > best_score:
-                    best_score = score
-                    best_match = known_symptom
-            
-            # Word overlap
-            if input_words and known_words:
-                overlap = len(input_words.intersection(known_words))
-                total = len(input_words.union(known_words))
-                if total > 0:
-                    score = overlap / total * 0.8
-                    if score > best_score:
-                        best_score = score
-                        best_match = known_symptom
+        sharing = set()
+        for word in input_words:
+            sharing |= self._word_to_symptoms.get(word, set())
+        
+        for i in sorted(sharing):
+            known_words = self._known_symptom_words[i]
+            overlap = len(input_words.intersection(known_words))
+            total = len(input_words.union(known_words))
+            score = overlap / total * 0.8
+            if score > best_score:
+                best_score = score
+                best_match = self._known_symptoms[i]
         
         return best_match, best_score
     
@@ -239,21 +517,12 @@ class ProfessionalDiseasePredictor:
         gender = patient_context.get('gender', 'unknown')
         chronic_conditions = patient_context.get('chronic_conditions', [])
         
-        # Score accumulator for each disease
-        disease_scores = defaultdict(lambda: {
-            'score': 0.0,
-            'matched_symptoms': [],
-            'matched_primary': 0,
-            'matched_secondary': 0,
-            'total_possible_primary': 0,
-            'total_possible_secondary': 0,
-            'severity_adjustment': 1.0,
-            'age_adjustment': 1.0,
-            'critical_match': False
-        })
-        
-        # Get all known symptoms for fuzzy matching
-        all_known_symptoms = list(self.symptom_disease_map.keys())
+        n_diseases = len(self.disease_names)
+        scores = np.zeros(n_diseases)
+        touched = np.zeros(n_diseases, dtype=bool)   # diseases linked to any matched symptom
+        critical = np.zeros(n_diseases, dtype=bool)
+        order = []     # touched disease ids, first match first (ranking ties keep this order)
+        matches = []   # (input symptom, matched symptom, confidence, severity) per match
         
         # Analyze each input symptom
         for symptom in symptoms:
@@ -264,114 +533,58 @@ class ProfessionalDiseasePredictor:
             severity_multiplier = self._extract_severity_from_text(symptom)
             
             # Fuzzy match to known symptoms
-            matched_symptom, confidence = self._fuzzy_symptom_match(symptom, all_known_symptoms)
+            matched_symptom, confidence = self._fuzzy_symptom_match(symptom)
             
             if matched_symptom and confidence > 0.5:
-                # Get diseases associated with this symptom
-                disease_links = self.symptom_disease_map[matched_symptom]
-                
-                for link in disease_links:
-                    disease_name = link['disease']
-                    weight = link['weight']
-                    symptom_type = link['type']
-                    
-                    # Calculate symptom contribution
-                    contribution = weight * confidence * severity_multiplier
-                    
-                    disease_scores[disease_name]['score'] += contribution
-                    disease_scores[disease_name]['matched_symptoms'].append({
-                        'input': symptom,
-                        'matched': matched_symptom,
-                        'confidence': confidence,
-                        'type': symptom_type,
-                        'severity_multiplier': severity_multiplier
-                    })
-                    
-                    if symptom_type == 'primary':
-                        disease_scores[disease_name]['matched_primary'] += 1
-                    else:
-                        disease_scores[disease_name]['matched_secondary'] += 1
-                    
-                    disease_scores[disease_name]['severity_adjustment'] = max(
-                        disease_scores[disease_name]['severity_adjustment'],
-                        severity_multiplier
-                    )
+                # Add every linked disease's contribution in one call
+                disease_idx = self.symptom_to_disease_idx[matched_symptom]
+                _accumulate(scores, disease_idx, self.symptom_to_weight[matched_symptom], confidence, severity_multiplier)
+                for disease_id in disease_idx.tolist():
+                    if not touched[disease_id]:
+                        touched[disease_id] = True
+                        order.append(disease_id)
+                matches.append((symptom, matched_symptom, confidence, severity_multiplier))
                 
                 # Check for critical symptoms
-                symptom_lower = symptom.lower()
-                for critical_symptom, critical_diseases in self.critical_symptoms.items():
-                    if critical_symptom in symptom_lower:
-                        for disease_name in critical_diseases:
-                            if disease_name in disease_scores:
-                                disease_scores[disease_name]['critical_match'] = True
-                                disease_scores[disease_name]['score'] *= 1.5  # Boost score significantly
-        
-        # Calculate total possible symptoms for each disease
-        for disease_name, scores in disease_scores.items():
-            if disease_name in self.diseases:
-                disease_info = self.diseases[disease_name]
-                scores['total_possible_primary'] = len(disease_info['primary_symptoms'])
-                scores['total_possible_secondary'] = len(disease_info['secondary_symptoms'])
+                for critical_id in _phrases_in(symptom.lower(), self._critical_phrases, self._critical_automaton):
+                    critical_idx = self._critical_idx[critical_id]
+                    hit = critical_idx[touched[critical_idx]]
+                    critical[hit] = True
+                    scores[hit] *= 1.5  # Boost score significantly
         
         # Apply age-based adjustments
         age_group = self._get_age_group(age)
-        age_related_diseases = self.age_risk_factors.get(age_group, [])
-        
-        for disease_name in disease_scores:
-            if disease_name in age_related_diseases:
-                disease_scores[disease_name]['age_adjustment'] = 1.2
-                disease_scores[disease_name]['score'] *= 1.2
+        age_related_diseases = self.age_risk_factors.get(age_group, frozenset())
+        scores *= self.age_mult_arr.get(age_group, 1.0)
         
         # Apply prevalence-based adjustments (favor more common diseases)
-        for disease_name in disease_scores:
-            if disease_name in self.diseases:
-                prevalence = self.diseases[disease_name].get('prevalence', 'Common')
-                prevalence_multiplier = self.prevalence_multipliers.get(prevalence, 1.0)
-                disease_scores[disease_name]['prevalence_adjustment'] = prevalence_multiplier
-                disease_scores[disease_name]['score'] *= prevalence_multiplier
+        scores *= self.prevalence_mult_arr
         
         # Apply common symptom pattern boosts
-        symptom_set = set([s.lower().strip() for s in symptoms])
-        for pattern_symptoms, boosted_diseases in self.common_patterns.items():
+        # A term is present when it occurs inside any user symptom; joined with
+        # newlines (which no term contains) that is one substring test per term
+        user_text = "\n".join(set([s.lower().strip() for s in symptoms]))
+        present_terms = {term for term in self._pattern_token_index if term in user_text}
+        candidate_patterns = set()
+        for term in present_terms:
+            candidate_patterns.update(self._pattern_token_index[term])
+        for pattern_id in sorted(candidate_patterns):
+            pattern_symptoms, boosted_idx = self._pattern_idx[pattern_id]
             # Check if the pattern symptoms are present in user's symptoms
-            pattern_match = all(
-                any(pattern_symptom in user_symptom for user_symptom in symptom_set)
-                for pattern_symptom in pattern_symptoms
-            )
-            
-            if pattern_match:
-                for disease_name in boosted_diseases:
-                    if disease_name in disease_scores:
-                        # Boost common diseases that match typical patterns
-                        disease_scores[disease_name]['score'] *= 2.5  # Increased from 1.8
-                        disease_scores[disease_name]['pattern_boost'] = True
+            if pattern_symptoms.issubset(present_terms):
+                # Boost common diseases that match typical patterns
+                scores[boosted_idx[touched[boosted_idx]]] *= 2.5  # Increased from 1.8
         
         # Apply chronic condition adjustments
-        if chronic_conditions:
-            chronic_disease_boost = {
-                "diabetes": ["Type 2 Diabetes", "Type 1 Diabetes", "Chronic Kidney Disease", "Heart Attack", "Stroke"],
-                "hypertension": ["Hypertension", "Heart Attack", "Stroke", "Chronic Kidney Disease", "Heart Failure"],
-                "high blood pressure": ["Hypertension", "Heart Attack", "Stroke", "Chronic Kidney Disease"],
-                "asthma": ["Asthma", "COPD", "Bronchitis", "Pneumonia"],
-                "heart disease": ["Heart Attack", "Angina", "Heart Failure", "Arrhythmia"],
-                "kidney": ["Chronic Kidney Disease", "Kidney Stones", "UTI"],
-                "thyroid": ["Hyperthyroidism", "Hypothyroidism"],
-                "arthritis": ["Rheumatoid Arthritis", "Osteoarthritis", "Gout"],
-            }
-            
-            for condition in chronic_conditions:
-                condition_lower = condition.lower()
-                for condition_keyword, related_diseases in chronic_disease_boost.items():
-                    if condition_keyword in condition_lower:
-                        for disease_name in related_diseases:
-                            if disease_name in disease_scores:
-                                # Boost diseases related to chronic conditions
-                                disease_scores[disease_name]['score'] *= 1.6
-                                disease_scores[disease_name]['chronic_condition_boost'] = True
+        for condition in chronic_conditions:
+            for keyword_id in _phrases_in(condition.lower(), self._chronic_keywords, self._chronic_automaton):
+                related_idx = self._chronic_idx[keyword_id]
+                # Boost diseases related to chronic conditions
+                scores[related_idx[touched[related_idx]]] *= 1.6
         
         # Calculate probabilities
-        predictions = []
-        total_score = sum(scores['score'] for scores in disease_scores.values())
+        order = np.asarray(order, dtype=np.intp)
+        total_score = sum(scores[order].tolist())
         
         if total_score == 0:
             return {
@@ -380,66 +593,24 @@ class ProfessionalDiseasePredictor:
                 "input_symptoms": symptoms
             }
         
-        for disease_name, scores in disease_scores.items():
-            if disease_name not in self.diseases:
-                continue
-            
-            disease_info = self.diseases[disease_name]
-            
-            # Calculate probability
-            raw_probability = (scores['score'] / total_score) * 100
-            
-            # Calculate confidence based on symptom match quality
-            if scores['total_possible_primary'] > 0:
-                primary_match_ratio = scores['matched_primary'] / scores['total_possible_primary']
-            else:
-                primary_match_ratio = 0
-            
-            confidence_score = (
-                primary_match_ratio * 0.6 +  # Primary symptoms are most important
-                (len(scores['matched_symptoms']) / max(len(symptoms), 1)) * 0.4  # Overall match coverage
-            ) * 100
-            
-            # Adjust for critical symptoms
-            if scores['critical_match']:
-                raw_probability *= 1.3
-                confidence_score = min(confidence_score * 1.2, 95)
-            
-            # Normalize probability (cap at reasonable values)
-            probability = min(raw_probability, 95)
-            
-            # Only include diseases with reasonable probability
-            if probability >= 5:  # At least 5% probability
-                prediction = {
-                    'disease': disease_name,
-                    'probability': round(probability, 1),
-                    'confidence': round(confidence_score, 1),
-                    'department': disease_info['department'],
-                    'severity': disease_info['severity'],
-                    'description': disease_info['description'],
-                    'matched_symptoms': len(scores['matched_symptoms']),
-                    'total_symptoms': len(disease_info['all_symptoms']),
-                    'primary_symptoms_matched': scores['matched_primary'],
-                    'secondary_symptoms_matched': scores['matched_secondary'],
-                    'has_critical_symptoms': scores['critical_match'],
-                    'age_related': disease_name in age_related_diseases,
-                    'symptom_details': scores['matched_symptoms']
-                }
-                
-                # Add additional information from knowledge base
-                if disease_name in self.disease_knowledge:
-                    kb_info = self.disease_knowledge[disease_name]
-                    prediction['treatment_info'] = kb_info.get('treatment', [])
-                    prediction['when_to_see_doctor'] = kb_info.get('when_to_see_doctor', '')
-                    prediction['duration'] = kb_info.get('duration', '')
-                
-                predictions.append(prediction)
-        
-        # Sort by probability (descending)
-        predictions.sort(key=lambda x: x['probability'], reverse=True)
-        
-        # Take top 5 predictions
-        top_predictions = predictions[:5]
+        raw_probability = (scores[order] / total_score) * 100
+        # Adjust for critical symptoms
+        raw_probability[critical[order]] *= 1.3
+        
+        # Only include diseases with reasonable probability (at least 5%), capped
+        # at 95%, and rank them before any per-disease detail is built
+        keep = raw_probability >= 5
+        candidates = [
+            (disease_id, min(probability, 95))
+            for disease_id, probability in zip(order[keep].tolist(), raw_probability[keep].tolist())
+        ]
+        
+        # Top 5 predictions by probability (descending; ties keep match order)
+        top = heapq.nlargest(5, candidates, key=lambda c: round(c[1], 1))
+        top_predictions = [
+            self._build_prediction(disease_id, probability, bool(critical[disease_id]), matches, len(symptoms), age_related_diseases)
+            for disease_id, probability in top
+        ]
         
         # Generate professional analysis
         analysis = self._generate_professional_analysis(top_predictions, symptoms, patient_context)
@@ -453,6 +624,64 @@ class ProfessionalDiseasePredictor:
             "patient_context": patient_context
         }
     
+    def _build_prediction(self, disease_id: int, probability: float, critical_match: bool,
+                          matches: List[Tuple], n_symptoms: int, age_related_diseases) -> Dict:
+        """Assemble one prediction dict, with its matched-symptom details"""
+        disease_name = self.disease_names[disease_id]
+        disease_info = self.diseases[disease_name]
+        symptom_disease_map = self.symptom_disease_map
+        
+        matched_details = []
+        matched_primary = 0
+        for input_symptom, matched_symptom, confidence, severity_multiplier in matches:
+            for link_disease_id, _, is_primary in symptom_disease_map[matched_symptom]:
+                if link_disease_id == disease_id:
+                    matched_details.append({
+                        'input': input_symptom,
+                        'matched': matched_symptom,
+                        'confidence': confidence,
+                        'type': 'primary' if is_primary else 'secondary',
+                        'severity_multiplier': severity_multiplier
+                    })
+                    matched_primary += is_primary
+        
+        # Calculate confidence based on symptom match quality
+        n_primary = disease_info['n_primary']
+        primary_match_ratio = matched_primary / n_primary if n_primary > 0 else 0
+        
+        confidence_score = (
+            primary_match_ratio * 0.6 +  # Primary symptoms are most important
+            (len(matched_details) / max(n_symptoms, 1)) * 0.4  # Overall match coverage
+        ) * 100
+        
+        if critical_match:
+            confidence_score = min(confidence_score * 1.2, 95)
+        
+        prediction = {
+            'disease': disease_name,
+            'probability': round(probability, 1),
+            'confidence': round(confidence_score, 1),
+            'department': disease_info['department'],
+            'severity': disease_info['severity'],
+            'description': disease_info['description'],
+            'matched_symptoms': len(matched_details),
+            'total_symptoms': len(disease_info['all_symptoms']),
+            'primary_symptoms_matched': matched_primary,
+            'secondary_symptoms_matched': len(matched_details) - matched_primary,
+            'has_critical_symptoms': critical_match,
+            'age_related': disease_name in age_related_diseases,
+            'symptom_details': matched_details
+        }
+        
+        # Add additional information from knowledge base
+        kb_info = self.disease_knowledge.get(disease_name)
+        if kb_info is not None:
+            prediction['treatment_info'] = kb_info.get('treatment', [])
+            prediction['when_to_see_doctor'] = kb_info.get('when_to_see_doctor', '')
+            prediction['duration'] = kb_info.get('duration', '')
+        
+        return prediction
+    
     def _generate_professional_analysis(self, predictions: List[Dict], symptoms: List[str], patient_context: Dict) -> Dict:
         """Generate professional medical analysis"""
         if not predictions:
@@ -464,14 +693,7 @@ class ProfessionalDiseasePredictor:
         top_prediction = predictions[0]
         
         # Determine urgency
-        urgency_map = {
-            "emergency": "IMMEDIATE MEDICAL ATTENTION REQUIRED",
-            "urgent": "Seek medical care within 24 hours",
-            "GP": "Schedule appointment with primary care physician",
-            "self-care": "Monitor symptoms, self-care measures may be sufficient"
-        }
-        
-        urgency = urgency_map.get(top_prediction['severity'], "Consult healthcare professional")
+        urgency = self.urgency_map.get(top_prediction['severity'], "Consult healthcare professional")
         
         # Build summary
         if len(predictions) == 1:
@@ -509,12 +731,15 @@ class ProfessionalDiseasePredictor:
 
 # Global instance
 _predictor_instance = None
+_predictor_lock = threading.Lock()
 
 def get_disease_predictor():
-    """Get or create disease predictor instance"""
+    """Get or create disease predictor instance (built once even under concurrent first calls)"""
     global _predictor_instance
     if _predictor_instance is None:
-        _predictor_instance = ProfessionalDiseasePredictor()
+        with _predictor_lock:
+            if _predictor_instance is None:
+                _predictor_instance = ProfessionalDiseasePredictor()
     return _predictor_instance
 
 def predict_diseases_professional(symptoms: List[str], patient_context: Dict = None) -> Dict:
@@ -4,14 +4,168 @@ Replaces the original CSV/JSON-based predictor with database queries
 """
 import os
 import sys
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
 from typing import List, Dict, Tuple
 from difflib import SequenceMatcher
-from sqlalchemy import func
+import numpy as np
+from sqlalchemy import text
 
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(__file__))
 
-from database import get_db_session, Disease, Symptom, DiseaseSymptom
+from database import Session, Disease, Symptom, DiseaseSymptom, PG_TRGM_ENABLED
+
+
+# The symptom vocabulary (id, lowercased name, lowercased synonyms) every
+# prediction matches against, held in memory instead of re-selected and
+# hydrated per request, plus an exact name/synonym -> id lookup and the display
+# names get_all_symptoms() returns. Reloaded after
+# SYMPTOM_CACHE_TTL seconds, or on the next call after invalidate_predictor_cache().
+SYMPTOM_CACHE_TTL = int(os.getenv('SYMPTOM_CACHE_TTL', 300))
+_symptoms_lock = threading.Lock()
+_symptoms = {'loaded_at': None, 'rows': None, 'exact_ids': None, 'names': None}
+
+
+def load_symptom_cache(db) -> Tuple[List[Tuple[int, str, Tuple[str, ...]]], Dict[str, int]]:
+    """
+    ((id, name, synonyms) of every symptom, {name or synonym: id}), all lowercased,
+    from one column-only query; names take precedence over synonyms in the lookup
+    """
+    now = time.monotonic()
+    with _symptoms_lock:
+        if _symptoms['loaded_at'] is None or now - _symptoms['loaded_at'] > SYMPTOM_CACHE_TTL:
+            rows = db.query(Symptom.id, Symptom.name, Symptom.synonyms).all()
+            _symptoms['names'] = tuple(name for _, name, _ in rows)
+            rows = [
+                (symptom_id, name.lower(), tuple(s.strip().lower() for s in synonyms.split(',')) if synonyms else ())
+                for symptom_id, name, synonyms in rows
+            ]
+            exact_ids = {}
+            for symptom_id, _, synonyms in rows:
+                for synonym in synonyms:
+                    exact_ids.setdefault(synonym, symptom_id)
+            exact_ids.update((name, symptom_id) for symptom_id, name, _ in reversed(rows))
+            _symptoms['rows'] = rows
+            _symptoms['exact_ids'] = exact_ids
+            _symptoms['loaded_at'] = now
+        return _symptoms['rows'], _symptoms['exact_ids']
+
+
+PREVALENCE_MULTIPLIERS = {
+    'Very Common': 2.0,
+    'Common': 1.5,
+    'Uncommon': 1.0,
+    'Rare': 0.6,
+    'Very Rare': 0.3
+}
+
+# Conditions boosted when the patient's age falls in the (inclusive) range
+AGE_RELATED_CONDITIONS = {
+    'Type 2 Diabetes': (40, 70),
+    'Hypertension': (45, 80),
+    'Heart Attack': (50, 80),
+    'Stroke': (55, 85),
+    'Osteoarthritis': (50, 80)
+}
+
+# Chronic-condition keyword -> conditions it makes more likely
+CHRONIC_RELATED = {
+    'diabetes': ['Type 2 Diabetes', 'Diabetic Ketoacidosis'],
+    'hypertension': ['Hypertension', 'Heart Attack', 'Stroke'],
+    'asthma': ['Asthma', 'Pneumonia', 'Bronchitis']
+}
+
+# Every disease and disease-symptom link, laid out as arrays indexed by the
+# disease's position so scoring a request is NumPy work in memory instead of a
+# join per request. Shares SYMPTOM_CACHE_TTL and invalidation with the vocabulary.
+_links_lock = threading.Lock()
+_links = {'loaded_at': None, 'model': None}
+
+
+def load_disease_links(db) -> Dict:
+    """
+    Disease columns and per-disease multiplier arrays, plus symptom id ->
+    (disease positions, weights, critical flags) arrays, from two column-only queries
+    """
+    now = time.monotonic()
+    with _links_lock:
+        if _links['loaded_at'] is None or now - _links['loaded_at'] > SYMPTOM_CACHE_TTL:
+            diseases = db.query(
+                Disease.id, Disease.name, Disease.description, Disease.severity,
+                Disease.prevalence, Disease.treatment, Disease.when_to_see_doctor
+            ).order_by(Disease.id).all()
+            position = {row.id: i for i, row in enumerate(diseases)}
+            
+            links = defaultdict(list)
+            for symptom_id, disease_id, weight, is_critical in db.query(
+                DiseaseSymptom.symptom_id, DiseaseSymptom.disease_id, DiseaseSymptom.weight, DiseaseSymptom.is_critical
+            ).order_by(DiseaseSymptom.id):
+                if disease_id in position:
+                    links[symptom_id].append((position[disease_id], float(weight or 0), bool(is_critical)))
+            
+            names = [row.name for row in diseases]
+            age_ranges = [AGE_RELATED_CONDITIONS.get(name, (np.inf, -np.inf)) for name in names]
+            _links['model'] = {
+                'diseases': [row._asdict() for row in diseases],
+                'by_symptom': {
+                    symptom_id: (
+                        np.asarray([link[0] for link in rows], dtype=np.intp),
+                        np.asarray([link[1] for link in rows], dtype=np.float64),
+                        np.asarray([link[2] for link in rows], dtype=np.intp),
+                    )
+                    for symptom_id, rows in links.items()
+                },
+                'prevalence_mult': np.asarray([
+                    PREVALENCE_MULTIPLIERS.get(row.prevalence or 'Uncommon', 1.0) for row in diseases
+                ], dtype=np.float64),
+                'age_low': np.asarray([low for low, _ in age_ranges], dtype=np.float64),
+                'age_high': np.asarray([high for _, high in age_ranges], dtype=np.float64),
+                'chronic_idx': {
+                    key: np.asarray([i for i, name in enumerate(names) if name in related], dtype=np.intp)
+                    for key, related in CHRONIC_RELATED.items()
+                },
+            }
+            _links['loaded_at'] = now
+        return _links['model']
+
+
+def invalidate_predictor_cache():
+    """Drop the cached symptom vocabulary, disease links and disease lookups; call after writing to those tables"""
+    with _symptoms_lock:
+        _symptoms['loaded_at'] = None
+    with _links_lock:
+        _links['loaded_at'] = None
+    _disease_by_name.cache_clear()
+
+
+# With pg_trgm: the most similar symptom for each input term, by trigram
+# similarity to the name or best word-level similarity within the synonyms,
+# found through the GIN indexes in one round trip for all inputs
+SYMPTOM_TRGM_THRESHOLD = 0.6
+SET_TRGM_THRESHOLD_SQL = text("""
+    SELECT set_config('pg_trgm.similarity_threshold', :threshold, true),
+           set_config('pg_trgm.word_similarity_threshold', :threshold, true)
+""")
+SYMPTOM_TRGM_MATCH_SQL = text("""
+    SELECT best.id
+    FROM unnest(CAST(:terms AS text[])) AS input(term)
+    CROSS JOIN LATERAL (
+        SELECT id FROM symptoms
+        WHERE lower(name) % input.term OR input.term <% lower(synonyms)
+        ORDER BY greatest(similarity(lower(name), input.term),
+                          word_similarity(input.term, lower(coalesce(synonyms, '')))) DESC, id
+        LIMIT 1
+    ) AS best
+""")
+
+
+@lru_cache(maxsize=4096)
+def _similarity_cached(str1: str, str2: str) -> float:
+    """SequenceMatcher ratio of two (already lowercased) strings, memoized across requests"""
+    return SequenceMatcher(None, str1, str2).ratio()
 
 
 class DiseasePredictorSQL:
@@ -19,13 +173,7 @@ class DiseasePredictorSQL:
     
     def __init__(self):
         self.db = None
-        self.prevalence_multipliers = {
-            'Very Common': 2.0,
-            'Common': 1.5,
-            'Uncommon': 1.0,
-            'Rare': 0.6,
-            'Very Rare': 0.3
-        }
+        self.prevalence_multipliers = PREVALENCE_MULTIPLIERS
     
     def predict_diseases_professional(self, symptoms: List[str], patient_context: Dict) -> List[Dict]:
         """
@@ -38,7 +186,7 @@ class DiseasePredictorSQL:
         Returns:
             List of disease predictions with probabilities
         """
-        self.db = get_db_session()
+        self.db = Session()
         
         try:
             # Step 1: Fuzzy match input symptoms to database symptoms
@@ -47,19 +195,18 @@ class DiseasePredictorSQL:
             if not matched_symptom_ids:
                 return self._get_fallback_predictions()
             
-            # Step 2: Query diseases that match these symptoms
-            disease_scores = self._calculate_disease_scores(matched_symptom_ids, patient_context)
+            # Step 2: Score diseases linked to these symptoms (in memory)
+            model = load_disease_links(self.db)
+            base_scores, matched, critical = self._calculate_disease_scores(matched_symptom_ids, model)
             
-            if not disease_scores:
+            if not matched.any():
                 return self._get_fallback_predictions()
             
             # Step 3: Apply scoring adjustments
-            adjusted_scores = self._apply_scoring_adjustments(disease_scores, patient_context)
-            
-            # Step 4: Normalize to percentages and format results
-            predictions = self._normalize_and_format(adjusted_scores)
+            scores = self._apply_scoring_adjustments(base_scores, matched, critical, model, patient_context)
             
-            return predictions[:5]  # Return top 5
+            # Step 4: Normalize to percentages and format the top 5
+            return self._normalize_and_format(scores, matched, model)
             
         finally:
             if self.db:
@@ -71,24 +218,38 @@ class DiseasePredictorSQL:
         Returns list of symptom IDs
         """
         matched_ids = []
+        unmatched = []
         
-        # Get all symptoms from database
-        all_symptoms = self.db.query(Symptom).all()
+        # All symptoms, from the process-wide cache
+        all_symptoms, exact_ids = load_symptom_cache(self.db)
         
         for input_symptom in input_symptoms:
             input_lower = input_symptom.lower().strip()
             
-            for db_symptom in all_symptoms:
+            # Verbatim symptom names and synonyms need no similarity scoring
+            if input_lower in exact_ids:
+                matched_ids.append(exact_ids[input_lower])
+            else:
+                unmatched.append(input_lower)
+        
+        if PG_TRGM_ENABLED:
+            if unmatched:
+                self.db.execute(SET_TRGM_THRESHOLD_SQL, {'threshold': str(SYMPTOM_TRGM_THRESHOLD)})
+                rows = self.db.execute(SYMPTOM_TRGM_MATCH_SQL, {'terms': unmatched}).all()
+                matched_ids.extend(row[0] for row in rows)
+            return list(set(matched_ids))
+        
+        for input_lower in unmatched:
+            for symptom_id, name, synonyms in all_symptoms:
                 # Check exact match on symptom name
-                if self._similarity(input_lower, db_symptom.name.lower()) >= 0.8:
-                    matched_ids.append(db_symptom.id)
+                if _similarity_cached(input_lower, name) >= 0.8:
+                    matched_ids.append(symptom_id)
                     break
                 
                 # Check synonyms
-                synonyms = db_symptom.get_synonyms_list()
                 for synonym in synonyms:
-                    if self._similarity(input_lower, synonym.lower()) >= 0.8:
-                        matched_ids.append(db_symptom.id)
+                    if _similarity_cached(input_lower, synonym) >= 0.8:
+                        matched_ids.append(symptom_id)
                         break
                 else:
                     continue
@@ -96,177 +257,103 @@ class DiseasePredictorSQL:
         
         return list(set(matched_ids))  # Remove duplicates
     
-    def _calculate_disease_scores(self, symptom_ids: List[int], patient_context: Dict) -> Dict:
+    def _calculate_disease_scores(self, symptom_ids: List[int], model: Dict) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
-        Calculate base scores for diseases based on matched symptoms
+        Base scores (summed weights), matched-symptom counts and critical-symptom
+        counts per disease position for the matched symptoms
         """
-        disease_scores = {}
+        n_diseases = len(model['diseases'])
+        base_scores = np.zeros(n_diseases)
+        matched = np.zeros(n_diseases, dtype=np.intp)
+        critical = np.zeros(n_diseases, dtype=np.intp)
         
-        # Query all disease-symptom relationships for matched symptoms
-        results = self.db.query(
-            Disease.id,
-            Disease.name,
-            Disease.description,
-            Disease.severity,
-            Disease.prevalence,
-            Disease.treatment,
-            Disease.when_to_see_doctor,
-            DiseaseSymptom.weight,
-            DiseaseSymptom.is_critical,
-            func.count(DiseaseSymptom.symptom_id).label('symptom_count')
-        ).join(
-            DiseaseSymptom, Disease.id == DiseaseSymptom.disease_id
-        ).filter(
-            DiseaseSymptom.symptom_id.in_(symptom_ids)
-        ).group_by(
-            Disease.id,
-            Disease.name,
-            Disease.description,
-            Disease.severity,
-            Disease.prevalence,
-            Disease.treatment,
-            Disease.when_to_see_doctor,
-            DiseaseSymptom.weight,
-            DiseaseSymptom.is_critical
-        ).all()
+        for symptom_id in symptom_ids:
+            links = model['by_symptom'].get(symptom_id)
+            if links is None:
+                continue
+            disease_idx, weights, is_critical = links
+            np.add.at(base_scores, disease_idx, weights)
+            np.add.at(matched, disease_idx, 1)
+            np.add.at(critical, disease_idx, is_critical)
         
-        # Aggregate scores by disease
-        for result in results:
-            disease_id = result[0]
-            
-            if disease_id not in disease_scores:
-                disease_scores[disease_id] = {
-                    'name': result[1],
-                    'description': result[2],
-                    'severity': result[3],
-                    'prevalence': result[4],
-                    'treatment': result[5],
-                    'when_to_see_doctor': result[6],
-                    'base_score': 0,
-                    'matched_symptoms': 0,
-                    'critical_symptoms': 0
-                }
-            
-            # Add weighted score
-            weight = float(result[7])
-            is_critical = result[8]
-            
-            disease_scores[disease_id]['base_score'] += weight
-            disease_scores[disease_id]['matched_symptoms'] += 1
-            
-            if is_critical:
-                disease_scores[disease_id]['critical_symptoms'] += 1
-        
-        return disease_scores
+        return base_scores, matched, critical
     
-    def _apply_scoring_adjustments(self, disease_scores: Dict, patient_context: Dict) -> Dict:
+    def _apply_scoring_adjustments(self, base_scores: np.ndarray, matched: np.ndarray, critical: np.ndarray,
+                                   model: Dict, patient_context: Dict) -> np.ndarray:
         """
         Apply prevalence, age, and pattern-based adjustments to scores
         """
-        adjusted_scores = {}
         patient_age = patient_context.get('age', 30)
         chronic_conditions = patient_context.get('chronic_conditions', [])
         
-        for disease_id, data in disease_scores.items():
-            score = data['base_score']
-            
-            # 1. Prevalence multiplier
-            prevalence = data.get('prevalence', 'Uncommon')
-            multiplier = self.prevalence_multipliers.get(prevalence, 1.0)
-            score *= multiplier
-            
-            # 2. Critical symptom boost
-            if data['critical_symptoms'] > 0:
-                score *= (1.0 + (data['critical_symptoms'] * 0.3))
-            
-            # 3. Age-related adjustments
-            age_related_conditions = {
-                'Type 2 Diabetes': (40, 70),
-                'Hypertension': (45, 80),
-                'Heart Attack': (50, 80),
-                'Stroke': (55, 85),
-                'Osteoarthritis': (50, 80)
-            }
-            
-            if data['name'] in age_related_conditions:
-                age_range = age_related_conditions[data['name']]
-                if age_range[0] <= patient_age <= age_range[1]:
-                    score *= 1.2
-            
-            # 4. Chronic condition boost
-            if chronic_conditions:
-                chronic_related = {
-                    'diabetes': ['Type 2 Diabetes', 'Diabetic Ketoacidosis'],
-                    'hypertension': ['Hypertension', 'Heart Attack', 'Stroke'],
-                    'asthma': ['Asthma', 'Pneumonia', 'Bronchitis']
-                }
-                
-                for chronic_cond in chronic_conditions:
-                    chronic_lower = chronic_cond.lower()
-                    for key, related_diseases in chronic_related.items():
-                        if key in chronic_lower and data['name'] in related_diseases:
-                            score *= 1.6
-            
-            # 5. Multiple symptom bonus
-            if data['matched_symptoms'] >= 3:
-                score *= 1.3
-            elif data['matched_symptoms'] >= 5:
-                score *= 1.5
-            
-            adjusted_scores[disease_id] = {
-                'name': data['name'],
-                'description': data['description'],
-                'severity': data['severity'],
-                'prevalence': data['prevalence'],
-                'treatment': data['treatment'],
-                'when_to_see_doctor': data['when_to_see_doctor'],
-                'score': score,
-                'matched_symptoms': data['matched_symptoms']
-            }
+        # 1. Prevalence multiplier
+        scores = base_scores * model['prevalence_mult']
+        
+        # 2. Critical symptom boost
+        scores *= np.where(critical > 0, 1.0 + critical * 0.3, 1.0)
+        
+        # 3. Age-related adjustments
+        if patient_age is not None:
+            scores[(model['age_low'] <= patient_age) & (patient_age <= model['age_high'])] *= 1.2
         
-        return adjusted_scores
+        # 4. Chronic condition boost
+        for chronic_cond in chronic_conditions or []:
+            chronic_lower = chronic_cond.lower()
+            for key, related_idx in model['chronic_idx'].items():
+                if key in chronic_lower:
+                    scores[related_idx] *= 1.6
+        
+        # 5. Multiple symptom bonus
+        scores[matched >= 3] *= 1.3
+        
+        return scores
     
-    def _normalize_and_format(self, adjusted_scores: Dict) -> List[Dict]:
+    def _normalize_and_format(self, scores: np.ndarray, matched: np.ndarray, model: Dict) -> List[Dict]:
         """
-        Normalize scores to percentages (5-95%) and format results
+        Normalize scores to percentages (5-95%) and format the top 5 results
         """
-        # Convert to list and sort by score
-        predictions = list(adjusted_scores.values())
-        predictions.sort(key=lambda x: x['score'], reverse=True)
-        
-        if not predictions:
+        # Diseases with a matched symptom
+        candidates = np.flatnonzero(matched)
+        if candidates.size == 0:
             return []
+        candidate_scores = scores[candidates]
         
         # Get score range
-        max_score = predictions[0]['score']
-        min_score = predictions[-1]['score'] if len(predictions) > 1 else 0
+        max_score = candidate_scores.max()
+        min_score = candidate_scores.min() if candidates.size > 1 else 0
+        
+        # Top 5 by score (ties by disease id): partial selection, then order just those
+        top = candidates
+        if candidates.size > 5:
+            kth = np.partition(candidate_scores, candidates.size - 5)[candidates.size - 5]
+            above = candidates[candidate_scores > kth]
+            top = np.concatenate((above, candidates[candidate_scores == kth][:5 - above.size]))
+            top.sort()
+        ranked = top[np.argsort(-scores[top], kind='stable')].tolist()
         
         # Normalize to 5-95% range
         formatted_predictions = []
-        for pred in predictions:
+        for i in ranked:
+            disease = model['diseases'][i]
             if max_score == min_score:
                 probability = 50.0
             else:
                 # Scale to 5-95 range
-                normalized = (pred['score'] - min_score) / (max_score - min_score)
+                normalized = (scores[i] - min_score) / (max_score - min_score)
                 probability = 5 + (normalized * 90)  # 5% to 95%
             
             formatted_predictions.append({
-                'condition': pred['name'],
-                'probability': round(probability, 1),
-                'description': pred['description'],
-                'severity': pred['severity'],
-                'treatment': pred['treatment'],
-                'when_to_see_doctor': pred['when_to_see_doctor'],
-                'matched_symptoms': pred['matched_symptoms']
+                'condition': disease['name'],
+                'probability': round(float(probability), 1),
+                'description': disease['description'],
+                'severity': disease['severity'],
+                'treatment': disease['treatment'],
+                'when_to_see_doctor': disease['when_to_see_doctor'],
+                'matched_symptoms': int(matched[i])
             })
         
         return formatted_predictions
     
-    def _similarity(self, str1: str, str2: str) -> float:
-        """Calculate similarity between two strings"""
-        return SequenceMatcher(None, str1, str2).ratio()
-    
     def _get_fallback_predictions(self) -> List[Dict]:
         """Return generic predictions when no matches found"""
         return [
@@ -296,11 +383,10 @@ def predict_diseases(symptoms: List[str], patient_context: Dict = None) -> List[
     return predictor.predict_diseases_professional(symptoms, patient_context)
 
 
-def get_disease_by_name(disease_name: str) -> Dict:
-    """
-    Get detailed information about a specific disease
-    """
-    db = get_db_session()
+@lru_cache(maxsize=512)
+def _disease_by_name(disease_name: str) -> Dict:
+    """Uncached body of get_disease_by_name for a lowercased, stripped name"""
+    db = Session()
     try:
         disease = db.query(Disease).filter(Disease.name.ilike(f'%{disease_name}%')).first()
         
@@ -320,14 +406,25 @@ def get_disease_by_name(disease_name: str) -> Dict:
         db.close()
 
 
-def get_all_symptoms() -> List[str]:
+def get_disease_by_name(disease_name: str) -> Dict:
+    """
+    Get detailed information about a specific disease
+    (memoized per name until invalidate_predictor_cache())
+    """
+    disease = _disease_by_name(disease_name.lower().strip())
+    return dict(disease) if disease is not None else None
+
+
+def get_all_symptoms() -> Tuple[str, ...]:
     """
-    Get list of all recognized symptoms
+    Get all recognized symptom names (a shared tuple from the symptom cache,
+    so repeat calls within SYMPTOM_CACHE_TTL need no query)
     """
-    db = get_db_session()
+    db = Session()
     try:
-        symptoms = db.query(Symptom.name).all()
-        return [s[0] for s in symptoms]
+        load_symptom_cache(db)
+        with _symptoms_lock:
+            return _symptoms['names']
     finally:
         db.close()
 
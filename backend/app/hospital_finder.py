@@ -1,7 +1,74 @@
 import pandas as pd
+import numpy as np
 import math
+import re
+from collections import defaultdict
 from typing import List, Dict, Optional, Tuple
 import json
+from functools import lru_cache
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+try:
+    from numba import njit
+    NUMBA_ENABLED = True
+except ImportError:
+    NUMBA_ENABLED = False
+
+EARTH_RADIUS_KM = 6371
+
+# Below this many located hospitals a vectorized scan of all of them is faster
+# than a KD-tree query plus refinement, so smaller datasets get no tree
+KDTREE_MIN_HOSPITALS = 256
+
+# Major city coordinates for India (latitude, longitude)
+CITY_COORDINATES = {
+    'delhi': (28.6139, 77.2090),
+    'new delhi': (28.6139, 77.2090),
+    'mumbai': (19.0760, 72.8777),
+    'bangalore': (12.9716, 77.5946),
+    'bengaluru': (12.9716, 77.5946),
+    'hyderabad': (17.3850, 78.4867),
+    'chennai': (13.0827, 80.2707),
+    'pune': (18.5204, 73.8567),
+    'gurgaon': (28.4595, 77.0266),
+    'gurugram': (28.4595, 77.0266),
+    'noida': (28.5355, 77.3910),
+    'vellore': (12.9165, 79.1325),
+    'chandigarh': (30.7333, 76.7794),
+    'kolkata': (22.5726, 88.3639),
+    'ahmedabad': (23.0225, 72.5714),
+    'jaipur': (26.9124, 75.7873)
+}
+
+
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Unrounded Haversine distance in km between two points in degrees"""
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    delta_lat = math.radians(lat2 - lat1)
+    delta_lon = math.radians(lon2 - lon1)
+    
+    a = math.sin(delta_lat / 2) ** 2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon / 2) ** 2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    
+    return EARTH_RADIUS_KM * c
+
+
+if NUMBA_ENABLED:
+    # Native code for scalar callers; no fastmath, so results match the Python version
+    _haversine_km = njit(cache=True)(_haversine_km)
+    _haversine_km(0.0, 0.0, 0.0, 0.0)  # compile at import, not on the first request
+
+
+@lru_cache(maxsize=2048)
+def lookup_city_coordinates(city_name: str) -> Optional[Tuple[float, float]]:
+    """Coordinates for a city name; cached on the raw input, so repeats skip normalization"""
+    return CITY_COORDINATES.get(city_name.lower().strip())
+
 
 class HospitalFinder:
     """
@@ -18,48 +85,160 @@ class HospitalFinder:
             print(f"⚠️ Hospital database not found at {hospital_csv_path}")
             self.hospitals_df = pd.DataFrame()
         
-        # Major city coordinates for India (latitude, longitude)
-        self.city_coordinates = {
-            'delhi': (28.6139, 77.2090),
-            'new delhi': (28.6139, 77.2090),
-            'mumbai': (19.0760, 72.8777),
-            'bangalore': (12.9716, 77.5946),
-            'bengaluru': (12.9716, 77.5946),
-            'hyderabad': (17.3850, 78.4867),
-            'chennai': (13.0827, 80.2707),
-            'pune': (18.5204, 73.8567),
-            'gurgaon': (28.4595, 77.0266),
-            'gurugram': (28.4595, 77.0266),
-            'noida': (28.5355, 77.3910),
-            'vellore': (12.9165, 79.1325),
-            'chandigarh': (30.7333, 76.7794),
-            'kolkata': (22.5726, 88.3639),
-            'ahmedabad': (23.0225, 72.5714),
-            'jaipur': (26.9124, 75.7873)
-        }
+        self.city_coordinates = CITY_COORDINATES
+        
+        # Plain per-row dicts, built once, so results index a list instead of
+        # materializing a pandas row per returned hospital
+        self._rows = self.hospitals_df.to_dict('records')
+        
+        # Per-hospital columns derived once here instead of per row on every search:
+        # lowercased city/department text, the emergency flag, and the coordinates
+        # of hospitals in known cities (the only ones distance searches can return)
+        def column(name):
+            if name in self.hospitals_df:
+                return self.hospitals_df[name].astype(str)
+            return pd.Series('', index=self.hospitals_df.index, dtype=str)
+        
+        self._city_lower = column('city').str.lower()
+        self._dept_lower = column('department').str.lower()
+        self._is_emergency = (column('emergency_services').str.lower() == 'yes').to_numpy(dtype=bool)
+        self._multi_mask = self._dept_lower.str.contains('multi-specialty', regex=False, na=False).to_numpy(dtype=bool)
+        self._dept_masks = {}
+        
+        # Lowercased city -> its row positions (ascending), for city searches
+        city_rows = defaultdict(list)
+        for i, city in enumerate(self._city_lower):
+            if isinstance(city, str):
+                city_rows[city].append(i)
+        self._city_index = {city: np.asarray(rows, dtype=np.intp) for city, rows in city_rows.items()}
+        
+        coords = [self.get_city_coordinates(city) for city in column('city')]
+        self._located = np.array([i for i, c in enumerate(coords) if c], dtype=np.intp)
+        self._lat = np.array([coords[i][0] for i in self._located], dtype=np.float64)
+        self._lon = np.array([coords[i][1] for i in self._located], dtype=np.float64)
+        
+        # KD-tree over unit-sphere (x, y, z) points: chord length is monotonic in
+        # great-circle distance, so a ball query returns exactly the hospitals
+        # within a radius, and only those need the exact Haversine distance
+        self._tree = None
+        if cKDTree is not None and self._located.size >= KDTREE_MIN_HOSPITALS:
+            self._tree = cKDTree(self._unit_vectors(self._lat, self._lon))
     
     def haversine_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """
         Calculate distance between two points on Earth using Haversine formula.
         Returns distance in kilometers.
         """
-        R = 6371  # Earth's radius in kilometers
+        return round(_haversine_km(lat1, lon1, lat2, lon2), 2)
+    
+    @staticmethod
+    def _unit_vectors(lat, lon) -> np.ndarray:
+        """Unit-sphere (x, y, z) rows for latitudes/longitudes in degrees"""
+        lat_rad, lon_rad = np.radians(lat), np.radians(lon)
+        return np.column_stack((
+            np.cos(lat_rad) * np.cos(lon_rad),
+            np.cos(lat_rad) * np.sin(lon_rad),
+            np.sin(lat_rad),
+        ))
+    
+    def _haversine_a(self, lat: float, lon: float, idx: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Haversine term a = sin²(Δlat/2) + cos·cos·sin²(Δlon/2) from a point to every
+        located hospital, or to those at positions `idx`; monotonic in distance
+        """
+        hosp_lat = self._lat if idx is None else self._lat[idx]
+        hosp_lon = self._lon if idx is None else self._lon[idx]
         
-        lat1_rad = math.radians(lat1)
-        lat2_rad = math.radians(lat2)
-        delta_lat = math.radians(lat2 - lat1)
-        delta_lon = math.radians(lon2 - lon1)
+        lat1_rad = math.radians(lat)
+        lat2_rad = np.radians(hosp_lat)
+        delta_lat = np.radians(hosp_lat - lat)
+        delta_lon = np.radians(hosp_lon - lon)
         
-        a = math.sin(delta_lat / 2) ** 2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon / 2) ** 2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+        return np.sin(delta_lat / 2) ** 2 + math.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(delta_lon / 2) ** 2
+    
+    @staticmethod
+    def _distance_from_a(a: np.ndarray) -> np.ndarray:
+        """Distances in km for Haversine terms, rounded like haversine_distance"""
+        c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+        return np.round(EARTH_RADIUS_KM * c, 2)
+    
+    def _haversine_vec(self, lat: float, lon: float, idx: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Distance in km (rounded like haversine_distance) from a point to every
+        hospital in a known city, or to the located hospitals at positions `idx`
+        """
+        return self._distance_from_a(self._haversine_a(lat, lon, idx))
+    
+    def _within(self, lat: float, lon: float, max_distance: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (positions in _located, rounded distances) of the hospitals within
+        max_distance km, positions ascending
+        """
+        # Central angle for the radius, padded past the 0.01 km rounding of the final distances
+        angle = min((max_distance + 0.01) / EARTH_RADIUS_KM, math.pi)
         
-        distance = R * c
-        return round(distance, 2)
+        if self._tree is None:
+            # Threshold on the Haversine term itself; the arctan2/sqrt distance is
+            # only computed for the hospitals that pass
+            a = self._haversine_a(lat, lon)
+            idx = np.flatnonzero(a <= math.sin(angle / 2) ** 2)
+            distances = self._distance_from_a(a[idx])
+        else:
+            # Chord for the same radius
+            candidates = self._tree.query_ball_point(self._unit_vectors(lat, lon)[0], r=2 * math.sin(angle / 2))
+            idx = np.sort(np.asarray(candidates, dtype=np.intp))
+            distances = self._haversine_vec(lat, lon, idx)
+        
+        keep = distances <= max_distance
+        return idx[keep], distances[keep]
+    
+    def _department_mask(self, department: str, regex: bool = False) -> np.ndarray:
+        """
+        Rows whose department contains `department` (as plain text, or as a regex
+        for city searches) or is multi-specialty; memoized per department
+        """
+        key = (department.lower(), regex)
+        mask = self._dept_masks.get(key)
+        if mask is None:
+            mask = self._dept_lower.str.contains(key[0], regex=regex, na=False).to_numpy(dtype=bool) | self._multi_mask
+            if len(self._dept_masks) < 256:
+                self._dept_masks[key] = mask
+        return mask
+    
+    def _nearest(self, idx: np.ndarray, distances: np.ndarray, limit: int) -> List[Tuple[int, float]]:
+        """
+        (row position, distance) for located-hospital positions `idx` with their
+        `distances`, nearest first (ties keep file order), at most `limit`
+        """
+        if 0 < limit < distances.size:
+            # Partial selection of the `limit` nearest (earliest rows among ties
+            # at the cut-off), then order just those
+            kth = np.partition(distances, limit - 1)[limit - 1]
+            rows = np.arange(distances.size)
+            below = rows[distances < kth]
+            order = np.concatenate((below, rows[distances == kth][:limit - below.size]))
+            order.sort()
+            order = order[np.argsort(distances[order], kind='stable')]
+        else:
+            order = np.argsort(distances, kind='stable')[:limit]
+        return list(zip(self._located[idx[order]].tolist(), distances[order].tolist()))
+    
+    def _hospital_info(self, hospital) -> Dict:
+        """Response dict for one hospital row"""
+        return {
+            'name': hospital.get('hospital_name', 'Unknown'),
+            'department': hospital.get('department', 'General'),
+            'address': hospital.get('address', ''),
+            'city': hospital.get('city', ''),
+            'state': hospital.get('state', ''),
+            'phone': hospital.get('phone', ''),
+            'emergency_services': hospital.get('emergency_services', 'Unknown'),
+            'rating': hospital.get('rating', 'N/A')
+        }
     
     def get_city_coordinates(self, city_name: str) -> Optional[Tuple[float, float]]:
         """Get coordinates for a city name"""
-        city_lower = city_name.lower().strip()
-        return self.city_coordinates.get(city_lower)
+        return lookup_city_coordinates(city_name)
     
     def find_nearby_hospitals(
         self,
@@ -85,46 +264,22 @@ class HospitalFinder:
         if self.hospitals_df.empty:
             return []
         
-        # Calculate distance for each hospital
-        hospitals_with_distance = []
+        # Located hospitals within range, with their distances
+        idx, distances = self._within(user_lat, user_lon, max_distance)
         
-        for _, hospital in self.hospitals_df.iterrows():
-            # Get hospital city coordinates
-            city = hospital.get('city', '').strip()
-            city_coords = self.get_city_coordinates(city)
-            
-            if not city_coords:
-                continue
-            
-            hospital_lat, hospital_lon = city_coords
-            distance = self.haversine_distance(user_lat, user_lon, hospital_lat, hospital_lon)
-            
-            # Filter by department if specified
-            if department:
-                hospital_dept = str(hospital.get('department', '')).lower()
-                if department.lower() not in hospital_dept and 'multi-specialty' not in hospital_dept:
-                    continue
-            
-            # Filter by distance
-            if distance <= max_distance:
-                hospital_info = {
-                    'name': hospital.get('hospital_name', 'Unknown'),
-                    'department': hospital.get('department', 'General'),
-                    'address': hospital.get('address', ''),
-                    'city': hospital.get('city', ''),
-                    'state': hospital.get('state', ''),
-                    'phone': hospital.get('phone', ''),
-                    'emergency_services': hospital.get('emergency_services', 'Unknown'),
-                    'rating': hospital.get('rating', 'N/A'),
-                    'distance_km': distance
-                }
-                hospitals_with_distance.append(hospital_info)
+        # Filter by department if specified
+        if department:
+            keep = self._department_mask(department)[self._located[idx]]
+            idx, distances = idx[keep], distances[keep]
         
-        # Sort by distance
-        hospitals_with_distance.sort(key=lambda x: x['distance_km'])
+        # Nearest first, limited
+        hospitals_with_distance = []
+        for i, distance in self._nearest(idx, distances, limit):
+            hospital_info = self._hospital_info(self._rows[i])
+            hospital_info['distance_km'] = distance
+            hospitals_with_distance.append(hospital_info)
         
-        # Return limited results
-        return hospitals_with_distance[:limit]
+        return hospitals_with_distance
     
     def find_hospitals_by_city(
         self,
@@ -148,42 +303,22 @@ class HospitalFinder:
         
         # Get city coordinates for distance calculation
         city_coords = self.get_city_coordinates(city_name)
+        city_lower = city_name.lower()
         if not city_coords:
-            # If city not found, search by name matching
-            city_lower = city_name.lower()
-            filtered = self.hospitals_df[
-                self.hospitals_df['city'].str.lower().str.contains(city_lower, na=False)
-            ]
+            # If city not found, search by name matching (over the distinct city names)
+            pattern = re.compile(city_lower)
+            matches = [rows for city, rows in self._city_index.items() if pattern.search(city)]
+            idx = np.sort(np.concatenate(matches)) if matches else np.empty(0, dtype=np.intp)
         else:
             # Use exact city match
-            city_lower = city_name.lower()
-            filtered = self.hospitals_df[
-                self.hospitals_df['city'].str.lower() == city_lower
-            ]
+            idx = self._city_index.get(city_lower, np.empty(0, dtype=np.intp))
         
         # Filter by department if specified
         if department:
-            filtered = filtered[
-                filtered['department'].str.lower().str.contains(department.lower(), na=False) |
-                filtered['department'].str.lower().str.contains('multi-specialty', na=False)
-            ]
+            idx = idx[self._department_mask(department, regex=True)[idx]]
         
         # Convert to list of dicts
-        hospitals = []
-        for _, hospital in filtered.head(limit).iterrows():
-            hospital_info = {
-                'name': hospital.get('hospital_name', 'Unknown'),
-                'department': hospital.get('department', 'General'),
-                'address': hospital.get('address', ''),
-                'city': hospital.get('city', ''),
-                'state': hospital.get('state', ''),
-                'phone': hospital.get('phone', ''),
-                'emergency_services': hospital.get('emergency_services', 'Unknown'),
-                'rating': hospital.get('rating', 'N/A')
-            }
-            hospitals.append(hospital_info)
-        
-        return hospitals
+        return [self._hospital_info(self._rows[i]) for i in idx[:limit].tolist()]
     
     def get_emergency_hospitals(
         self,
@@ -199,41 +334,19 @@ class HospitalFinder:
         if self.hospitals_df.empty:
             return []
         
-        # Filter for emergency services
-        emergency_hospitals = self.hospitals_df[
-            self.hospitals_df['emergency_services'].str.lower() == 'yes'
-        ]
+        # Emergency hospitals within range
+        idx, distances = self._within(user_lat, user_lon, max_distance)
+        keep = self._is_emergency[self._located[idx]]
+        idx, distances = idx[keep], distances[keep]
         
         hospitals_with_distance = []
+        for i, distance in self._nearest(idx, distances, limit):
+            hospital_info = self._hospital_info(self._rows[i])
+            hospital_info['emergency_services'] = 'Yes'
+            hospital_info['distance_km'] = distance
+            hospitals_with_distance.append(hospital_info)
         
-        for _, hospital in emergency_hospitals.iterrows():
-            city = hospital.get('city', '').strip()
-            city_coords = self.get_city_coordinates(city)
-            
-            if not city_coords:
-                continue
-            
-            hospital_lat, hospital_lon = city_coords
-            distance = self.haversine_distance(user_lat, user_lon, hospital_lat, hospital_lon)
-            
-            if distance <= max_distance:
-                hospital_info = {
-                    'name': hospital.get('hospital_name', 'Unknown'),
-                    'department': hospital.get('department', 'General'),
-                    'address': hospital.get('address', ''),
-                    'city': hospital.get('city', ''),
-                    'state': hospital.get('state', ''),
-                    'phone': hospital.get('phone', ''),
-                    'emergency_services': 'Yes',
-                    'rating': hospital.get('rating', 'N/A'),
-                    'distance_km': distance
-                }
-                hospitals_with_distance.append(hospital_info)
-        
-        # Sort by distance
-        hospitals_with_distance.sort(key=lambda x: x['distance_km'])
-        
-        return hospitals_with_distance[:limit]
+        return hospitals_with_distance
     
     def format_hospital_response(self, hospitals: List[Dict]) -> str:
         """Format hospital list for display"""
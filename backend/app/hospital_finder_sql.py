@@ -5,21 +5,104 @@ Replaces the original CSV-based hospital finder
 import os
 import sys
 import math
+import threading
+import time
+from collections import defaultdict
 from typing import List, Dict, Optional
-from sqlalchemy import func, and_, or_
+import numpy as np
+from sqlalchemy import func, and_, or_, cast, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
 
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(__file__))
 
-from database import get_db_session, Hospital, HospitalDepartment
+from database import session_scope, Hospital, HospitalDepartment, POSTGIS_ENABLED, Geography
+
+
+NEARBY_IN_DEPARTMENT_SQL = text("""
+    SELECT name, city, state, contact_number, latitude, longitude, departments,
+           ST_Distance(geog, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography, false) / 1000.0 AS distance_km
+    FROM mv_hospital_dept_geo
+    WHERE dept ILIKE :dept_pattern
+      AND ST_DWithin(geog, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography, :radius_m, false)
+    ORDER BY geog <-> ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography
+    LIMIT :limit
+""")
+
+
+EARTH_RADIUS_KM = 6371.0
+
+# The only hospital columns name/city listings return, so they skip whole-row loads
+HOSPITAL_LISTING_COLUMNS = (
+    Hospital.id, Hospital.name, Hospital.city, Hospital.state,
+    Hospital.contact_number, Hospital.latitude, Hospital.longitude
+)
+
+# Unit-sphere hospital points (structure-of-arrays) for the non-PostGIS path:
+# every distance in one matrix-vector product instead of Haversine per row in
+# SQL. Reloaded after HOSPITAL_POINTS_TTL seconds so new hospitals show up.
+HOSPITAL_POINTS_TTL = int(os.getenv('HOSPITAL_POINTS_TTL', 300))
+_points_lock = threading.Lock()
+_points = {'loaded_at': None, 'ids': None, 'xyz': None}
+
+
+def load_hospital_points(db):
+    """
+    (ids, xyz) arrays of every hospital with synced ecef columns, or None if none
+    are synced (or the table predates the columns and init_db() has not added them)
+    """
+    now = time.monotonic()
+    with _points_lock:
+        if _points['loaded_at'] is None or now - _points['loaded_at'] > HOSPITAL_POINTS_TTL:
+            try:
+                rows = db.query(Hospital.id, Hospital.ecef_x, Hospital.ecef_y, Hospital.ecef_z).filter(
+                    Hospital.ecef_x.isnot(None)
+                ).all()
+            except (OperationalError, ProgrammingError):
+                db.rollback()
+                rows = []
+            _points['ids'] = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+            _points['xyz'] = np.ascontiguousarray(
+                np.array([row[1:] for row in rows], dtype=np.float64).reshape(-1, 3)
+            )
+            _points['loaded_at'] = now
+        if _points['ids'].size == 0:
+            return None
+        return _points['ids'], _points['xyz']
+
+
+def bounding_box(latitude: float, longitude: float, radius_km: float):
+    """
+    (lat_min, lat_max, [(lon_min, lon_max), ...]) enclosing every point within
+    radius_km, longitude ranges split at the antimeridian; no longitude ranges
+    when the circle reaches a pole
+    """
+    # Padded slightly so rounding never drops a point on the boundary
+    angle = min((radius_km + 0.01) / EARTH_RADIUS_KM, math.pi)
+    lat_min = latitude - math.degrees(angle)
+    lat_max = latitude + math.degrees(angle)
+    if lat_min <= -90 or lat_max >= 90:
+        return max(lat_min, -90.0), min(lat_max, 90.0), []
+    
+    # Widest longitude extent of the circle (reached off the centre latitude)
+    delta_lon = math.degrees(math.asin(math.sin(angle) / math.cos(math.radians(latitude))))
+    lon_min, lon_max = longitude - delta_lon, longitude + delta_lon
+    if lon_min < -180:
+        return lat_min, lat_max, [(lon_min + 360, 180.0), (-180.0, lon_max)]
+    if lon_max > 180:
+        return lat_min, lat_max, [(lon_min, 180.0), (-180.0, lon_max - 360)]
+    return lat_min, lat_max, [(lon_min, lon_max)]
+
+
+def unit_vector(latitude: float, longitude: float) -> np.ndarray:
+    """Unit-sphere (x, y, z) for a latitude/longitude in degrees"""
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    return np.array([math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat)])
 
 
 class HospitalFinderSQL:
     """Find nearby hospitals using SQL database with efficient geospatial queries"""
     
-    def __init__(self):
-        self.db = None
-    
     def find_nearby_hospitals(
         self,
         latitude: float,
@@ -41,9 +124,14 @@ class HospitalFinderSQL:
         Returns:
             List of hospitals sorted by distance
         """
-        self.db = get_db_session()
-        
-        try:
+        with session_scope() as db:
+            if POSTGIS_ENABLED:
+                return self._find_nearby_hospitals_postgis(db, latitude, longitude, department, radius_km, limit)
+            
+            points = load_hospital_points(db)
+            if points is not None:
+                return self._find_nearby_hospitals_vectorized(db, points, latitude, longitude, department, radius_km, limit)
+            
             # Haversine formula in SQL for distance calculation
             # Earth radius ~6371 km
             earth_radius = 6371
@@ -66,31 +154,43 @@ class HospitalFinderSQL:
                 )
             )
             
-            # Build base query
-            query = self.db.query(
-                Hospital,
+            # Candidate hospitals with their distance, computed once in a subquery
+            candidates = db.query(
+                Hospital.id.label('hospital_id'),
                 distance_expr.label('distance_km')
             )
             
             # Filter by department if specified
             if department:
-                query = query.join(Hospital.departments).filter(
+                candidates = candidates.join(Hospital.departments).filter(
                     HospitalDepartment.department_name.ilike(f'%{department}%')
                 )
             
-            # Filter by radius
-            query = query.filter(distance_expr <= radius_km)
+            # Index-friendly bounding box first, so the trig only runs on the
+            # hospitals inside it
+            lat_min, lat_max, lon_ranges = bounding_box(latitude, longitude, radius_km)
+            candidates = candidates.filter(Hospital.latitude.between(lat_min, lat_max))
+            if lon_ranges:
+                candidates = candidates.filter(or_(*(Hospital.longitude.between(lo, hi) for lo, hi in lon_ranges)))
             
             # Remove null coordinates
-            query = query.filter(
+            candidates = candidates.filter(
                 and_(
                     Hospital.latitude.isnot(None),
                     Hospital.longitude.isnot(None)
                 )
-            )
+            ).subquery()
             
-            # Order by distance and limit results
-            query = query.order_by('distance_km').limit(limit)
+            # Filter by radius, order by distance and limit results, all on the
+            # subquery's distance column
+            query = db.query(
+                Hospital,
+                candidates.c.distance_km
+            ).join(
+                candidates, Hospital.id == candidates.c.hospital_id
+            ).filter(
+                candidates.c.distance_km <= radius_km
+            ).order_by(candidates.c.distance_km).limit(limit)
             
             # Execute query
             results = query.all()
@@ -98,12 +198,9 @@ class HospitalFinderSQL:
             # Format results
             hospitals = []
             for hospital, distance in results:
-                # Get all departments for this hospital
-                departments = self.db.query(HospitalDepartment.department_name).filter(
-                    HospitalDepartment.hospital_id == hospital.id
-                ).all()
-                
-                dept_list = [dept[0] for dept in departments]
+                # All departments for this hospital, loaded for the whole
+                # result set by one selectin query
+                dept_list = [dept.department_name for dept in hospital.departments]
                 
                 hospitals.append({
                     'name': hospital.name,
@@ -117,95 +214,211 @@ class HospitalFinderSQL:
                 })
             
             return hospitals
+    
+    def _find_nearby_hospitals_vectorized(
+        self,
+        db,
+        points,
+        latitude: float,
+        longitude: float,
+        department: Optional[str],
+        radius_km: int,
+        limit: int
+    ) -> List[Dict]:
+        """
+        Nearby search over the cached unit-sphere points: the dot product with the
+        query point ranks every hospital at once, then only the winners are loaded
+        """
+        ids, xyz = points
+        query_point = unit_vector(latitude, longitude)
+        
+        cos_angle = xyz @ query_point
+        mask = cos_angle >= math.cos(min(radius_km / EARTH_RADIUS_KM, math.pi))
+        if department:
+            dept_ids = db.query(HospitalDepartment.hospital_id).filter(
+                HospitalDepartment.department_name.ilike(f'%{department}%')
+            ).distinct().all()
+            mask &= np.isin(ids, np.fromiter((row[0] for row in dept_ids), dtype=np.int64, count=len(dept_ids)))
+        
+        candidates = np.flatnonzero(mask)
+        if candidates.size > limit:
+            candidates = candidates[np.argpartition(-cos_angle[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.argsort(-cos_angle[candidates], kind='stable')]
+        
+        # Great-circle distance from the chord length (accurate at short range,
+        # where arccos of a dot product near 1 loses precision)
+        chord = np.linalg.norm(xyz[candidates] - query_point, axis=1)
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord / 2, 1.0))
+        
+        winner_ids = ids[candidates].tolist()
+        by_id = {
+            hospital.id: hospital
+            for hospital in db.query(Hospital).filter(Hospital.id.in_(winner_ids)).all()
+        }
+        
+        hospitals = []
+        for hospital_id, distance in zip(winner_ids, distances.tolist()):
+            hospital = by_id.get(hospital_id)
+            if hospital is None:
+                continue
+            hospitals.append({
+                'name': hospital.name,
+                'city': hospital.city or 'Unknown',
+                'state': hospital.state or 'Unknown',
+                'distance_km': round(distance, 2),
+                'contact': hospital.contact_number or 'Not available',
+                'departments': [dept.department_name for dept in hospital.departments],
+                'latitude': float(hospital.latitude) if hospital.latitude else None,
+                'longitude': float(hospital.longitude) if hospital.longitude else None
+            })
+        
+        return hospitals
+    
+    def _find_nearby_hospitals_postgis(
+        self,
+        db,
+        latitude: float,
+        longitude: float,
+        department: Optional[str],
+        radius_km: int,
+        limit: int
+    ) -> List[Dict]:
+        """
+        PostGIS variant of find_nearby_hospitals: ST_DWithin prunes candidates through
+        the GiST index on hospitals.location and <-> walks it in nearest-first order
+        """
+        if department:
+            return self._find_nearby_in_department_view(db, latitude, longitude, department, radius_km, limit)
+        
+        user_point = cast(
+            func.ST_SetSRID(func.ST_MakePoint(float(longitude), float(latitude)), 4326),
+            Geography('POINT', srid=4326)
+        )
+        
+        # Spherical distances (use_spheroid=false) to match the Haversine path
+        distance_expr = func.ST_Distance(Hospital.location, user_point, False) / 1000.0
+        
+        query = db.query(
+            Hospital,
+            distance_expr.label('distance_km')
+        ).filter(
+            func.ST_DWithin(Hospital.location, user_point, radius_km * 1000.0, False)
+        )
+        
+        results = query.order_by(Hospital.location.op('<->')(user_point)).limit(limit).all()
+        
+        hospitals = []
+        for hospital, distance in results:
+            # Loaded for the whole result set by one selectin query
+            departments = [dept.department_name for dept in hospital.departments]
             
-        finally:
-            if self.db:
-                self.db.close()
+            hospitals.append({
+                'name': hospital.name,
+                'city': hospital.city or 'Unknown',
+                'state': hospital.state or 'Unknown',
+                'distance_km': round(distance, 2),
+                'contact': hospital.contact_number or 'Not available',
+                'departments': departments,
+                'latitude': float(hospital.latitude) if hospital.latitude else None,
+                'longitude': float(hospital.longitude) if hospital.longitude else None
+            })
+        
+        return hospitals
+    
+    def _find_nearby_in_department_view(
+        self,
+        db,
+        latitude: float,
+        longitude: float,
+        department: str,
+        radius_km: int,
+        limit: int
+    ) -> List[Dict]:
+        """
+        Department-filtered PostGIS search against the mv_hospital_dept_geo
+        materialized view: one indexed scan, no hospital/department join
+        """
+        rows = db.execute(NEARBY_IN_DEPARTMENT_SQL, {
+            'lat': float(latitude),
+            'lon': float(longitude),
+            'dept_pattern': f'%{department}%',
+            'radius_m': radius_km * 1000.0,
+            'limit': limit
+        }).all()
+        
+        return [
+            {
+                'name': row.name,
+                'city': row.city or 'Unknown',
+                'state': row.state or 'Unknown',
+                'distance_km': round(row.distance_km, 2),
+                'contact': row.contact_number or 'Not available',
+                'departments': list(row.departments),
+                'latitude': float(row.latitude) if row.latitude else None,
+                'longitude': float(row.longitude) if row.longitude else None
+            }
+            for row in rows
+        ]
     
     def find_hospitals_by_name(self, search_term: str, limit: int = 10) -> List[Dict]:
         """
         Search hospitals by name
         """
-        self.db = get_db_session()
-        
-        try:
-            hospitals = self.db.query(Hospital).filter(
+        with session_scope() as db:
+            hospitals = db.query(*HOSPITAL_LISTING_COLUMNS).filter(
                 Hospital.name.ilike(f'%{search_term}%')
             ).limit(limit).all()
             
-            results = []
-            for hospital in hospitals:
-                departments = self.db.query(HospitalDepartment.department_name).filter(
-                    HospitalDepartment.hospital_id == hospital.id
-                ).all()
-                
-                results.append({
-                    'name': hospital.name,
-                    'city': hospital.city,
-                    'state': hospital.state,
-                    'contact': hospital.contact_number,
-                    'departments': [dept[0] for dept in departments],
-                    'latitude': float(hospital.latitude) if hospital.latitude else None,
-                    'longitude': float(hospital.longitude) if hospital.longitude else None
-                })
-            
-            return results
-            
-        finally:
-            if self.db:
-                self.db.close()
+            return self._hospital_listing(db, hospitals)
+    
+    @staticmethod
+    def _hospital_listing(db, hospitals) -> List[Dict]:
+        """Response dicts for HOSPITAL_LISTING_COLUMNS rows, departments fetched in one query"""
+        departments = defaultdict(list)
+        if hospitals:
+            for hospital_id, department_name in db.query(
+                HospitalDepartment.hospital_id, HospitalDepartment.department_name
+            ).filter(
+                HospitalDepartment.hospital_id.in_([hospital.id for hospital in hospitals])
+            ):
+                departments[hospital_id].append(department_name)
+        
+        return [
+            {
+                'name': hospital.name,
+                'city': hospital.city,
+                'state': hospital.state,
+                'contact': hospital.contact_number,
+                'departments': departments[hospital.id],
+                'latitude': float(hospital.latitude) if hospital.latitude else None,
+                'longitude': float(hospital.longitude) if hospital.longitude else None
+            }
+            for hospital in hospitals
+        ]
     
     def get_available_departments(self) -> List[str]:
         """
         Get list of all available departments across all hospitals
         """
-        self.db = get_db_session()
-        
-        try:
-            departments = self.db.query(
+        with session_scope() as db:
+            departments = db.query(
                 HospitalDepartment.department_name
             ).distinct().order_by(
                 HospitalDepartment.department_name
             ).all()
             
             return [dept[0] for dept in departments]
-            
-        finally:
-            if self.db:
-                self.db.close()
     
     def get_hospitals_by_city(self, city: str) -> List[Dict]:
         """
         Get all hospitals in a specific city
         """
-        self.db = get_db_session()
-        
-        try:
-            hospitals = self.db.query(Hospital).filter(
+        with session_scope() as db:
+            hospitals = db.query(*HOSPITAL_LISTING_COLUMNS).filter(
                 Hospital.city.ilike(f'%{city}%')
             ).all()
             
-            results = []
-            for hospital in hospitals:
-                departments = self.db.query(HospitalDepartment.department_name).filter(
-                    HospitalDepartment.hospital_id == hospital.id
-                ).all()
-                
-                results.append({
-                    'name': hospital.name,
-                    'city': hospital.city,
-                    'state': hospital.state,
-                    'contact': hospital.contact_number,
-                    'departments': [dept[0] for dept in departments],
-                    'latitude': float(hospital.latitude) if hospital.latitude else None,
-                    'longitude': float(hospital.longitude) if hospital.longitude else None
-                })
-            
-            return results
-            
-        finally:
-            if self.db:
-                self.db.close()
+            return self._hospital_listing(db, hospitals)
 
 
 # ==================== HELPER FUNCTIONS ====================
@@ -1,7 +1,16 @@
 # medicine_recommender.py - AI-powered Medicine Recommendation System
 import json
 import os
-from typing import List, Dict, Any, Optional
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+MEDICINE_DB_PATH = os.path.join(PROJECT_ROOT, "config", "medicine_database.json")
 
 class MedicineRecommender:
     def __init__(self):
@@ -12,18 +21,37 @@ class MedicineRecommender:
     def load_medicine_database(self):
         """Load medicine database from JSON file"""
         try:
-            # Get the project root directory
-            project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-            medicine_db_path = os.path.join(project_root, "config", "medicine_database.json")
-            
-            with open(medicine_db_path, 'r', encoding='utf-8') as f:
-                self.medicine_db = json.load(f)
+            with open(MEDICINE_DB_PATH, 'rb') as f:
+                raw = f.read()
+            self.medicine_db = orjson.loads(raw) if orjson else json.loads(raw.decode('utf-8'))
+            self._build_indexes()
             print("✅ Medicine database loaded successfully")
             
         except Exception as e:
             print(f"⚠️ Failed to load medicine database: {e}")
             self.medicine_db = None
     
+    def _build_indexes(self):
+        """Lookup tables derived once from the loaded database instead of per request"""
+        medicine_database = self.medicine_db.get("medicine_database", {})
+        
+        # Medicine name -> info (the first category listing a name wins, as a category
+        # scan would), and (info, conditions, lowercased conditions) per medicine in
+        # category order for symptom searches
+        self._medicine_by_name = {}
+        self._medicine_conditions = []
+        for medicines in medicine_database.values():
+            for medicine_name, medicine_info in medicines.items():
+                self._medicine_by_name.setdefault(medicine_name, medicine_info)
+                conditions = medicine_info.get("conditions", [])
+                self._medicine_conditions.append((medicine_info, conditions, [c.lower() for c in conditions]))
+        
+        # (lowercased condition, medicines) in mapping order, for partial condition matches
+        self._conditions_lower = [
+            (cond_name.lower(), medicines)
+            for cond_name, medicines in self.medicine_db.get("condition_medicine_mapping", {}).items()
+        ]
+    
     def get_medicine_recommendations(self, condition: str, patient_context: Dict = None) -> Dict[str, Any]:
         """Get medicine recommendations for a given condition"""
         if not self.medicine_db:
@@ -36,15 +64,15 @@ class MedicineRecommender:
         try:
             # Get condition mappings
             condition_mappings = self.medicine_db.get("condition_medicine_mapping", {})
-            medicine_database = self.medicine_db.get("medicine_database", {})
             
             # Find medicines for the condition
             recommended_medicines = condition_mappings.get(condition, [])
             
             if not recommended_medicines:
                 # Try partial matching if exact condition not found
-                for cond_name, medicines in condition_mappings.items():
-                    if condition.lower() in cond_name.lower() or cond_name.lower() in condition.lower():
+                condition_lower = condition.lower()
+                for cond_name, medicines in self._conditions_lower:
+                    if condition_lower in cond_name or cond_name in condition_lower:
                         recommended_medicines = medicines
                         break
             
@@ -59,7 +87,7 @@ class MedicineRecommender:
             # Process recommendations
             recommendations = []
             for medicine_name in recommended_medicines:
-                medicine_info = self._find_medicine_info(medicine_name, medicine_database)
+                medicine_info = self._find_medicine_info(medicine_name)
                 if medicine_info:
                     # Apply safety checks and filters
                     safety_check = self._perform_safety_check(medicine_info, patient_context)
@@ -96,12 +124,9 @@ class MedicineRecommender:
                 "recommendations": []
             }
     
-    def _find_medicine_info(self, medicine_name: str, medicine_database: Dict) -> Optional[Dict]:
+    def _find_medicine_info(self, medicine_name: str) -> Optional[Dict]:
         """Find medicine information in the database"""
-        for category, medicines in medicine_database.items():
-            if medicine_name in medicines:
-                return medicines[medicine_name]
-        return None
+        return self._medicine_by_name.get(medicine_name)
     
     def _perform_safety_check(self, medicine_info: Dict, patient_context: Dict = None) -> Dict[str, Any]:
         """Perform safety checks for the medicine"""
@@ -211,8 +236,7 @@ class MedicineRecommender:
         if not self.medicine_db:
             return {"success": False, "error": "Medicine database not available"}
         
-        medicine_database = self.medicine_db.get("medicine_database", {})
-        medicine_info = self._find_medicine_info(medicine_name, medicine_database)
+        medicine_info = self._find_medicine_info(medicine_name)
         
         if not medicine_info:
             return {"success": False, "error": f"Medicine '{medicine_name}' not found"}
@@ -239,27 +263,28 @@ class MedicineRecommender:
         if not self.medicine_db:
             return {"success": False, "error": "Medicine database not available"}
         
-        medicine_database = self.medicine_db.get("medicine_database", {})
+        symptoms_lower = [symptom.lower() for symptom in symptoms]
         matching_medicines = []
         
-        # Search through all medicines for symptom matches
-        for category, medicines in medicine_database.items():
-            for medicine_name, medicine_info in medicines.items():
-                medicine_conditions = medicine_info.get("conditions", [])
-                
-                # Check if any symptoms match medicine conditions
-                for symptom in symptoms:
-                    for condition in medicine_conditions:
-                        if symptom.lower() in condition.lower() or condition.lower() in symptom.lower():
-                            if medicine_info not in matching_medicines:
-                                matching_medicines.append({
-                                    "medicine_name": medicine_info["generic_name"],
-                                    "brand_names": medicine_info.get("brand_names", []),
-                                    "type": medicine_info.get("type", ""),
-                                    "matching_conditions": [c for c in medicine_conditions if any(s.lower() in c.lower() for s in symptoms)],
-                                    "otc_available": medicine_info.get("otc", False)
-                                })
-                            break
+        # Search through all medicines for symptom matches (conditions pre-lowercased)
+        for medicine_info, medicine_conditions, conditions_lower in self._medicine_conditions:
+            matching_conditions = None
+            
+            # Check if any symptoms match medicine conditions
+            for symptom in symptoms_lower:
+                if any(symptom in condition or condition in symptom for condition in conditions_lower):
+                    if matching_conditions is None:
+                        matching_conditions = [
+                            c for c, c_lower in zip(medicine_conditions, conditions_lower)
+                            if any(s in c_lower for s in symptoms_lower)
+                        ]
+                    matching_medicines.append({
+                        "medicine_name": medicine_info["generic_name"],
+                        "brand_names": medicine_info.get("brand_names", []),
+                        "type": medicine_info.get("type", ""),
+                        "matching_conditions": matching_conditions,
+                        "otc_available": medicine_info.get("otc", False)
+                    })
         
         return {
             "success": True,
@@ -268,18 +293,58 @@ class MedicineRecommender:
             "disclaimer": "These are potential matches based on symptoms. Always consult healthcare professionals for proper diagnosis and treatment."
         }
 
+# Shared recommender for the helpers below, reloaded when the database file changes
+_recommender_instance = None
+_recommender_mtime = None
+_recommender_lock = threading.Lock()
+
+def _medicine_db_mtime() -> Optional[float]:
+    try:
+        return os.path.getmtime(MEDICINE_DB_PATH)
+    except OSError:
+        return None
+
+def get_medicine_recommender() -> MedicineRecommender:
+    """Get or create the shared recommender (the database is loaded once per file version)"""
+    global _recommender_instance, _recommender_mtime
+    mtime = _medicine_db_mtime()
+    if _recommender_instance is None or mtime != _recommender_mtime:
+        with _recommender_lock:
+            if _recommender_instance is None or mtime != _recommender_mtime:
+                _recommender_instance = MedicineRecommender()
+                _recommender_mtime = mtime
+    return _recommender_instance
+
 # Helper functions for API integration
 def get_medicine_recommendations_for_condition(condition: str, patient_context: Dict = None) -> Dict[str, Any]:
     """Main function to get medicine recommendations"""
-    recommender = MedicineRecommender()
+    recommender = get_medicine_recommender()
     return recommender.get_medicine_recommendations(condition, patient_context)
 
+def get_medicine_recommendations_for_conditions(conditions: List[str], patient_context: Dict = None) -> Dict[str, Dict[str, Any]]:
+    """Get medicine recommendations for several conditions"""
+    recommender = get_medicine_recommender()
+    return {
+        condition: recommender.get_medicine_recommendations(condition, patient_context)
+        for condition in dict.fromkeys(conditions)
+    }
+
+def get_medicine_recommendations_batch(requests: List[Tuple[str, Dict]]) -> List[Dict[str, Any]]:
+    """Recommendations for a batch of (condition, patient_context) pairs, in order"""
+    recommender = get_medicine_recommender()
+    return [recommender.get_medicine_recommendations(condition, context) for condition, context in requests]
+
+def search_medicines_by_symptoms_batch(symptom_lists: List[List[str]]) -> List[Dict[str, Any]]:
+    """Symptom searches for a batch of symptom lists, in order"""
+    recommender = get_medicine_recommender()
+    return [recommender.search_medicines_by_symptom(symptoms) for symptoms in symptom_lists]
+
 def get_medicine_details(medicine_name: str) -> Dict[str, Any]:
     """Get detailed medicine information"""
-    recommender = MedicineRecommender()
+    recommender = get_medicine_recommender()
     return recommender.get_medicine_details(medicine_name)
 
 def search_medicines_by_symptoms(symptoms: List[str]) -> Dict[str, Any]:
     """Search medicines by symptoms"""
-    recommender = MedicineRecommender()
+    recommender = get_medicine_recommender()
     return recommender.search_medicines_by_symptom(symptoms)
\ No newline at end of file
@@ -1,9 +1,21 @@
 # parser.py - AI-powered symptom extraction and analysis
 import spacy
+import copy
 import re
 import json
 import os
 from typing import List, Dict, Tuple
+from functools import lru_cache
+
+# Compiled once and shared by every request
+SYMPTOM_PATTERNS = [
+    re.compile(r"(pain|ache|hurt|sore)\s+in\s+(\w+)"),
+    re.compile(r"(difficulty|trouble|problem)\s+(\w+)"),
+    re.compile(r"(feeling|feel)\s+(sick|nauseous|dizzy|weak)"),
+    re.compile(r"(can'?t|cannot)\s+(sleep|eat|breathe|swallow)"),
+    re.compile(r"(burning|tingling|numbness)\s+in\s+(\w+)")
+]
+DURATION_PATTERN = re.compile(r"(\d+)\s*(day|week|month|hour)s?")
 
 class AISymptomParser:
     def __init__(self):
@@ -106,16 +118,8 @@ class AISymptomParser:
                     break
         
         # Pattern-based extraction for compound symptoms
-        patterns = [
-            r"(pain|ache|hurt|sore)\s+in\s+(\w+)",
-            r"(difficulty|trouble|problem)\s+(\w+)",
-            r"(feeling|feel)\s+(sick|nauseous|dizzy|weak)",
-            r"(can'?t|cannot)\s+(sleep|eat|breathe|swallow)",
-            r"(burning|tingling|numbness)\s+in\s+(\w+)"
-        ]
-        
-        for pattern in patterns:
-            matches = re.finditer(pattern, text_lower)
+        for pattern in SYMPTOM_PATTERNS:
+            matches = pattern.finditer(text_lower)
             for match in matches:
                 symptom_phrase = match.group(0)
                 # Convert to canonical form if possible
@@ -156,8 +160,7 @@ class AISymptomParser:
                     break
         
         # Extract duration information
-        duration_pattern = r"(\d+)\s*(day|week|month|hour)s?"
-        duration_matches = re.findall(duration_pattern, text_lower)
+        duration_matches = DURATION_PATTERN.findall(text_lower)
         if duration_matches:
             patterns["duration"] = duration_matches[0]
         
@@ -279,9 +282,17 @@ class AISymptomParser:
 # Global instance for easy access
 ai_parser = AISymptomParser()
 
+@lru_cache(maxsize=4096)
+def _parse_symptoms_cached(text_lower: str) -> Dict:
+    return ai_parser.enhanced_symptom_extraction(text_lower)
+
 def parse_symptoms_with_ai(user_text: str) -> Dict:
     """Convenience function for AI-powered symptom parsing"""
-    return ai_parser.enhanced_symptom_extraction(user_text)
+    # Every analysis step lowercases its input, so the spaCy pass is cached per
+    # lowercased text; callers get their own copy carrying their original text
+    result = copy.deepcopy(_parse_symptoms_cached(user_text.lower()))
+    result["ai_analysis"]["original_text"] = user_text
+    return result
 
 if __name__ == "__main__":
     # Test the AI parser
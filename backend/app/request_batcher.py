@@ -0,0 +1,94 @@
+# request_batcher.py - Adaptive batching of concurrent API calls
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, List, Optional
+
+
+class RequestBatcher:
+    """
+    Collect concurrent calls for a short window and run them as one batch.
+
+    Request threads call submit() and block on a Future; a background thread
+    drains up to `max_batch_size` queued calls (waiting at most `batch_wait_ms`
+    after the first one), deduplicates them by key, runs `batch_fn` once over
+    the unique payloads and scatters the results back.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_batch_size: int = 32, batch_wait_ms: float = 15):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.batch_wait = batch_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, key: Hashable, payload: Any, timeout: Optional[float] = 30) -> Any:
+        """
+        Queue one call and wait for its result (re-raises the call's exception,
+        or concurrent.futures.TimeoutError after `timeout` seconds)
+        """
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((key, payload, future))
+        return future.result(timeout)
+
+    def _ensure_worker(self):
+        # Started on first use so it runs in the serving process, not a
+        # pre-fork master whose threads do not survive into workers
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="request-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect(self):
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            try:
+                self._process(items)
+            except Exception as e:
+                # Never let the worker die: fail whatever is still unresolved
+                for _, _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _process(self, items):
+        unique = {}
+        for key, payload, _ in items:
+            unique.setdefault(key, payload)
+
+        results, errors = {}, {}
+        try:
+            batch_results = self.batch_fn(list(unique.values()))
+            if len(batch_results) != len(unique):
+                raise ValueError(f"batch_fn returned {len(batch_results)} results for {len(unique)} payloads")
+            results = dict(zip(unique, batch_results))
+        except Exception:
+            # One bad payload must not fail its neighbours: retry individually
+            for key, payload in unique.items():
+                try:
+                    results[key] = self.batch_fn([payload])[0]
+                except Exception as e:
+                    errors[key] = e
+
+        for key, _, future in items:
+            if key in errors:
+                future.set_exception(errors[key])
+            else:
+                future.set_result(results[key])
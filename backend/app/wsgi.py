@@ -0,0 +1,6 @@
+"""
+WSGI entry point for production servers
+Run from the project root:  gunicorn -c backend/gunicorn.conf.py
+(or from backend/app:       gunicorn -w 4 -k gthread --threads 16 wsgi:application)
+"""
+from api import app as application
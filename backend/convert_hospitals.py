@@ -0,0 +1,56 @@
+"""
+Convert data/hospitals.csv into a typed columnar data/hospitals.npz
+Run this once (and again whenever hospitals.csv changes) so the API can load
+hospital columns directly instead of re-parsing the CSV on every startup
+"""
+import csv
+import os
+
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+CSV_PATH = os.path.join(DATA_DIR, 'hospitals.csv')
+NPZ_PATH = os.path.join(DATA_DIR, 'hospitals.npz')
+
+
+def convert_hospitals(csv_path=CSV_PATH, npz_path=NPZ_PATH):
+    """Read the hospital CSV, drop rows with bad coordinates and write typed columns"""
+    lat, lon, name, city, contact, depts = [], [], [], [], [], []
+    skipped = 0
+
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            try:
+                row_lat = float(row['location_lat'])
+                row_lon = float(row['location_lon'])
+            except (KeyError, TypeError, ValueError):
+                skipped += 1
+                continue
+            if not (-90 <= row_lat <= 90 and -180 <= row_lon <= 180):
+                skipped += 1
+                continue
+
+            lat.append(row_lat)
+            lon.append(row_lon)
+            name.append(row['hospital_name'])
+            city.append(row['city'])
+            contact.append(row['contact_number'])
+            depts.append(row['departments_available'])
+
+    np.savez(
+        npz_path,
+        location_lat=np.asarray(lat, dtype=np.float64),
+        location_lon=np.asarray(lon, dtype=np.float64),
+        hospital_name=np.asarray(name, dtype=str),
+        city=np.asarray(city, dtype=str),
+        contact_number=np.asarray(contact, dtype=str),
+        departments_available=np.asarray(depts, dtype=str),
+    )
+
+    print(f"✅ Wrote {len(lat)} hospitals to {npz_path}")
+    if skipped:
+        print(f"⚠️  Skipped {skipped} rows with invalid coordinates")
+
+
+if __name__ == "__main__":
+    convert_hospitals()
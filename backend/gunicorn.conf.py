@@ -0,0 +1,32 @@
+"""
+Gunicorn configuration for the Health AI API (production serving)
+Run from the project root:  gunicorn -c backend/gunicorn.conf.py
+"""
+import multiprocessing
+import os
+
+# api.py and the AI modules resolve their imports and config paths from backend/app
+chdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app")
+wsgi_app = "wsgi:application"
+bind = os.getenv("BIND", "0.0.0.0:5000")
+
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+
+# Meinheld's greenlet worker when it is installed, otherwise threaded workers;
+# the API mostly waits on the database and LLM calls, so threads overlap well
+try:
+    import meinheld  # noqa: F401
+    worker_class = "meinheld.gmeinheld.MeinheldWorker"
+except ImportError:
+    worker_class = "gthread"
+    threads = int(os.getenv("GUNICORN_THREADS", 8))
+
+# Reuse client connections instead of a new TCP handshake per request
+keepalive = 30
+
+# Import api.py (JSON knowledge bases, hospital arrays, models) once in the
+# master; forked workers then share those pages copy-on-write
+preload_app = True
+
+timeout = 120
+accesslog = "-"
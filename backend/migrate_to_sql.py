@@ -11,8 +11,11 @@ from pathlib import Path
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent / 'app'))
 
+from sqlalchemy import text
+
 from database import (
-    init_db, get_db_session, test_connection,
+    engine, init_db, get_db_session, test_connection, sync_hospital_locations, sync_hospital_ecef,
+    create_hospital_dept_view, refresh_hospital_dept_view, create_trgm_indexes,
     Disease, Symptom, DiseaseSymptom, Hospital, HospitalDepartment, Medicine
 )
 
@@ -269,6 +272,39 @@ def migrate_hospitals():
         db.close()
 
 
+def as_list(value):
+    """Array-column value from a JSON list or a comma-separated string"""
+    if isinstance(value, list):
+        return value
+    if value:
+        return [item.strip() for item in str(value).split(',')]
+    return []
+
+
+MEDICINE_ARRAY_COLUMNS = ('indications', 'side_effects', 'contraindications', 'interactions')
+
+
+def convert_medicine_columns_to_arrays():
+    """One-shot upgrade of older databases whose medicine list columns are comma-separated text"""
+    if engine.dialect.name != 'postgresql':
+        return
+    with engine.begin() as conn:
+        for column in MEDICINE_ARRAY_COLUMNS:
+            data_type = conn.execute(text(
+                "SELECT data_type FROM information_schema.columns "
+                "WHERE table_name = 'medicines' AND column_name = :column"
+            ), {"column": column}).scalar()
+            
+            if data_type == 'text':
+                conn.execute(text(
+                    f"ALTER TABLE medicines ALTER COLUMN {column} TYPE varchar[] "
+                    f"USING string_to_array({column}, ', ')::varchar[]"
+                ))
+                print(f"  • medicines.{column} converted to an array column")
+        
+        conn.execute(text("CREATE INDEX IF NOT EXISTS med_ind_gin ON medicines USING GIN (indications)"))
+
+
 def migrate_medicines():
     """Migrate medicine_database.json to SQL"""
     print("\n📊 Migrating medicines...")
@@ -289,31 +325,14 @@ def migrate_medicines():
                 print(f"  ⚠️  Skipping {medicine_name} (already exists)")
                 continue
             
-            # Convert lists to comma-separated strings
-            indications = info.get('indications', [])
-            if isinstance(indications, list):
-                indications = ', '.join(indications)
-            
-            side_effects = info.get('side_effects', [])
-            if isinstance(side_effects, list):
-                side_effects = ', '.join(side_effects)
-            
-            contraindications = info.get('contraindications', [])
-            if isinstance(contraindications, list):
-                contraindications = ', '.join(contraindications)
-            
-            interactions = info.get('interactions', [])
-            if isinstance(interactions, list):
-                interactions = ', '.join(interactions)
-            
             medicine = Medicine(
                 name=medicine_name,
                 generic_name=info.get('generic_name', ''),
-                indications=indications,
+                indications=as_list(info.get('indications', [])),
                 dosage=str(info.get('dosage', '')),
-                side_effects=side_effects,
-                contraindications=contraindications,
-                interactions=interactions,
+                side_effects=as_list(info.get('side_effects', [])),
+                contraindications=as_list(info.get('contraindications', [])),
+                interactions=as_list(info.get('interactions', [])),
                 prescription_required=info.get('prescription_required', False)
             )
             db.add(medicine)
@@ -386,14 +405,20 @@ def main():
     # Initialize database (create tables)
     print("\n2️⃣  Initializing database tables...")
     init_db()
+    convert_medicine_columns_to_arrays()
     
     # Migrate data
     print("\n3️⃣  Migrating data from JSON/CSV files...")
     
     migrate_diseases()
     migrate_symptoms()
+    create_trgm_indexes()
     migrate_disease_symptom_mapping()
     migrate_hospitals()
+    sync_hospital_locations()
+    sync_hospital_ecef()
+    create_hospital_dept_view()
+    refresh_hospital_dept_view()
     migrate_medicines()
     
     # Verify migration
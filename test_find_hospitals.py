@@ -0,0 +1,89 @@
+"""
+Tests for the grid-cached nearest-hospital search in api.find_hospitals: the
+cache must never change which hospitals a user's own position returns
+"""
+import sys
+import os
+import random
+
+import numpy as np
+import pytest
+
+# SQLite in memory, so importing the API needs no PostgreSQL server
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+# Add backend/app to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend', 'app'))
+
+import api
+
+
+def _clear_caches():
+    for fn in (api._nearest_hospital_rows, api._department_tree, api._department_rows):
+        fn.cache_clear()
+
+
+@pytest.fixture
+def dense_hospitals(monkeypatch):
+    """1500 hospitals packed around two city centres, so grid cells hold many of them"""
+    rng = np.random.default_rng(3)
+    centres = np.array([[28.6139, 77.2090], [19.0760, 72.8777]])
+    points = centres[rng.integers(0, 2, 1500)] + rng.normal(0, 0.03, (1500, 2))
+    lat, lon = points[:, 0], points[:, 1]
+    depts = np.array(
+        [', '.join(rng.choice(['Cardiology', 'Neurology', 'General Medicine'], 2)) for _ in range(1500)],
+        dtype=object
+    )
+
+    lat_rad, lon_rad = np.radians(lat), np.radians(lon)
+    columns = {
+        'hosp_lat': lat, 'hosp_lon': lon,
+        'hosp_lat_rad': lat_rad, 'hosp_lon_rad': lon_rad, 'cos_hosp_lat_rad': np.cos(lat_rad),
+        'hosp_xyz': np.column_stack((np.cos(lat_rad) * np.cos(lon_rad), np.cos(lat_rad) * np.sin(lon_rad), np.sin(lat_rad))),
+        'hosp_name': np.array([f'Hospital {i}' for i in range(1500)], dtype=object),
+        'hosp_city': np.array(['City'] * 1500, dtype=object),
+        'hosp_contact': np.array(['-'] * 1500, dtype=object),
+        'hosp_depts': depts,
+    }
+    for name, value in columns.items():
+        monkeypatch.setattr(api, name, value)
+    _clear_caches()
+    yield lat, lon, depts
+    _clear_caches()
+
+
+def _brute_force(lat, lon, department, hospitals, k=3):
+    hosp_lat, hosp_lon, depts = hospitals
+    ranked = sorted(
+        (api.haversine(lat, lon, hosp_lat[i], hosp_lon[i]), i)
+        for i in range(hosp_lat.size) if department in depts[i]
+    )
+    return [f'Hospital {i}' for _, i in ranked[:k]]
+
+
+@pytest.mark.parametrize('path', ['tree', 'numba', 'numpy'])
+def test_cached_search_matches_brute_force(dense_hospitals, monkeypatch, path):
+    if path == 'tree':
+        pytest.importorskip('scipy')
+        monkeypatch.setattr(api, 'KDTREE_MIN_HOSPITALS', 0)
+    else:
+        monkeypatch.setattr(api, 'cKDTree', None)
+    if path == 'numba' and not api.NUMBA_ENABLED:
+        pytest.skip('numba is not installed')
+    if path == 'numpy':
+        monkeypatch.setattr(api, 'NUMBA_ENABLED', False)
+
+    rng = random.Random(4)
+    for _ in range(400):
+        lat, lon = rng.choice([(28.6139, 77.2090), (19.0760, 72.8777)])
+        # Many queries share a grid cell, and land anywhere inside it
+        lat += rng.randint(-3, 3) / 100 + rng.uniform(-0.005, 0.005)
+        lon += rng.randint(-3, 3) / 100 + rng.uniform(-0.005, 0.005)
+        department = rng.choice(['Cardiology', 'Neuro', 'General Medicine'])
+        got = [h['hospital'] for h in api.find_hospitals(lat, lon, department)]
+        assert got == _brute_force(lat, lon, department, dense_hospitals), (lat, lon, department)
+
+
+@pytest.mark.parametrize('department', [['Cardiology'], {'name': 'Cardiology'}, None, 5])
+def test_non_string_department_finds_nothing(department):
+    assert api.find_hospitals(28.6139, 77.2090, department) == []
@@ -0,0 +1,199 @@
+"""
+Tests for the nearest-hospital geometry helpers: bounding boxes, radius
+searches and the unit-sphere (ECEF) top-k
+"""
+import sys
+import os
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+# SQLite in memory, so the SQL finder runs without a PostgreSQL server
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+# Add backend/app to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend', 'app'))
+
+import hospital_finder
+import hospital_finder_sql
+from database import engine, init_db, sync_hospital_ecef, session_scope, Base, Hospital, HospitalDepartment
+from hospital_finder import HospitalFinder, CITY_COORDINATES
+from hospital_finder_sql import HospitalFinderSQL, bounding_box, calculate_distance_simple, unit_vector
+
+
+def _in_box(box, lat, lon):
+    lat_min, lat_max, lon_ranges = box
+    if not lat_min <= lat <= lat_max:
+        return False
+    return not lon_ranges or any(lo <= lon <= hi for lo, hi in lon_ranges)
+
+
+@pytest.mark.parametrize('latitude, longitude, radius_km', [
+    (28.6139, 77.2090, 50),
+    (12.9716, 77.5946, 5),
+    (-33.86, 151.21, 400),
+    (64.0, -21.0, 1500),
+    (0.0, 179.9, 300),
+])
+def test_bounding_box_contains_every_point_in_radius(latitude, longitude, radius_km):
+    rng = random.Random(0)
+    box = bounding_box(latitude, longitude, radius_km)
+    for _ in range(5000):
+        # Points scattered around the centre, well past the radius
+        lat = max(-90.0, min(90.0, latitude + rng.uniform(-1, 1) * radius_km / 50))
+        lon = (longitude + rng.uniform(-1, 1) * radius_km / 20 + 180) % 360 - 180
+        if calculate_distance_simple(latitude, longitude, lat, lon) <= radius_km:
+            assert _in_box(box, lat, lon), (lat, lon)
+
+
+def test_bounding_box_splits_at_antimeridian():
+    lat_min, lat_max, lon_ranges = bounding_box(10.0, 179.5, 200)
+    assert len(lon_ranges) == 2
+    (east_lo, east_hi), (west_lo, west_hi) = lon_ranges
+    assert east_hi == 180.0 and west_lo == -180.0
+    assert east_lo < 179.5 and -180.0 < west_hi < 0
+    assert _in_box((lat_min, lat_max, lon_ranges), 10.0, -179.5)
+
+    lat_min, lat_max, lon_ranges = bounding_box(-10.0, -179.5, 200)
+    assert [(lo, hi) for lo, hi in lon_ranges if hi == 180.0]
+    assert _in_box((lat_min, lat_max, lon_ranges), -10.0, 179.5)
+
+
+def test_bounding_box_reaching_a_pole_has_no_longitude_ranges():
+    lat_min, lat_max, lon_ranges = bounding_box(89.5, 30.0, 100)
+    assert lat_min < 89.5 and lat_max == 90.0 and lon_ranges == []
+    lat_min, lat_max, lon_ranges = bounding_box(-89.9, 0.0, 50)
+    assert lat_min == -90.0 and lon_ranges == []
+
+
+@pytest.fixture
+def hospitals_csv(tmp_path):
+    rng = random.Random(1)
+    cities = list(CITY_COORDINATES) + ['Nowhere']
+    rows = [
+        {
+            'hospital_name': f'Hospital {i}',
+            'city': rng.choice(cities).title(),
+            'department': rng.choice(['Cardiology', 'Neurology', 'Multi-specialty']),
+            'emergency_services': rng.choice(['Yes', 'No']),
+        }
+        for i in range(600)
+    ]
+    path = tmp_path / 'hospitals.csv'
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return str(path)
+
+
+def test_within_matches_brute_force(hospitals_csv, monkeypatch):
+    monkeypatch.setattr(hospital_finder, 'cKDTree', None)
+    finder = HospitalFinder(hospitals_csv)
+    assert finder._tree is None
+
+    for (lat, lon), radius in [((28.6139, 77.2090), 50), ((19.0760, 72.8777), 150), ((20.0, 78.0), 1200)]:
+        idx, distances = finder._within(lat, lon, radius)
+        expected = [
+            i for i in range(finder._located.size)
+            if finder.haversine_distance(lat, lon, finder._lat[i], finder._lon[i]) <= radius
+        ]
+        assert idx.tolist() == expected
+        assert distances.tolist() == [
+            finder.haversine_distance(lat, lon, finder._lat[i], finder._lon[i]) for i in expected
+        ]
+
+
+def test_within_kdtree_matches_linear_scan(hospitals_csv, monkeypatch):
+    pytest.importorskip('scipy')
+    monkeypatch.setattr(hospital_finder, 'KDTREE_MIN_HOSPITALS', 0)
+    tree = HospitalFinder(hospitals_csv)
+    monkeypatch.setattr(hospital_finder, 'cKDTree', None)
+    linear = HospitalFinder(hospitals_csv)
+    assert linear._tree is None and tree._tree is not None
+
+    for (lat, lon), radius in [((28.6139, 77.2090), 0), ((12.9716, 77.5946), 300), ((22.0, 80.0), 2000)]:
+        linear_idx, linear_dist = linear._within(lat, lon, radius)
+        tree_idx, tree_dist = tree._within(lat, lon, radius)
+        assert tree_idx.tolist() == linear_idx.tolist()
+        assert tree_dist.tolist() == linear_dist.tolist()
+
+
+@pytest.fixture
+def hospital_db():
+    init_db()
+    rng = random.Random(2)
+    with session_scope() as db:
+        for i in range(300):
+            hospital = Hospital(
+                name=f'Hospital {i}',
+                city='Test City',
+                latitude=round(rng.uniform(8.0, 35.0), 6),
+                longitude=round(rng.uniform(68.0, 97.0), 6),
+            )
+            hospital.departments = [
+                HospitalDepartment(department_name=name)
+                for name in rng.sample(['Cardiology', 'Neurology', 'Orthopedics'], rng.randint(1, 2))
+            ]
+            db.add(hospital)
+        db.commit()
+        points = [(h.name, float(h.latitude), float(h.longitude), [d.department_name for d in h.departments])
+                  for h in db.query(Hospital).all()]
+    hospital_finder_sql._points['loaded_at'] = None
+    yield points
+    hospital_finder_sql._points['loaded_at'] = None
+    Base.metadata.drop_all(bind=engine)
+
+
+def _brute_force(points, latitude, longitude, department, radius_km, limit):
+    ranked = sorted(
+        (calculate_distance_simple(latitude, longitude, lat, lon), name)
+        for name, lat, lon, departments in points
+        if not department or any(department.lower() in d.lower() for d in departments)
+    )
+    return [(name, round(distance, 2)) for distance, name in ranked if distance <= radius_km][:limit]
+
+
+@pytest.mark.parametrize('latitude, longitude, department, radius_km, limit', [
+    (28.6139, 77.2090, None, 500, 10),
+    (12.9716, 77.5946, 'cardio', 800, 5),
+    (20.0, 80.0, 'Neurology', 3000, 300),
+    (50.0, 10.0, None, 100, 10),
+])
+def test_ecef_top_k_matches_haversine(hospital_db, latitude, longitude, department, radius_km, limit):
+    finder = HospitalFinderSQL()
+
+    # Without synced columns (rows written before them) the SQL Haversine fallback answers
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE hospitals SET ecef_x = NULL, ecef_y = NULL, ecef_z = NULL"))
+    with session_scope() as db:
+        assert hospital_finder_sql.load_hospital_points(db) is None
+    fallback = finder.find_nearby_hospitals(latitude, longitude, department, radius_km, limit)
+
+    sync_hospital_ecef()
+    hospital_finder_sql._points['loaded_at'] = None
+    with session_scope() as db:
+        assert hospital_finder_sql.load_hospital_points(db) is not None
+    vectorized = finder.find_nearby_hospitals(latitude, longitude, department, radius_km, limit)
+
+    expected = _brute_force(hospital_db, latitude, longitude, department, radius_km, limit)
+    assert [(h['name'], h['distance_km']) for h in vectorized] == expected
+    assert [(h['name'], h['distance_km']) for h in fallback] == expected
+    assert vectorized == fallback
+
+
+def test_ecef_follows_inserts_and_moves(hospital_db):
+    with session_scope() as db:
+        hospital = Hospital(name='New Hospital', city='Test City', latitude=19.076, longitude=72.8777)
+        db.add(hospital)
+        db.commit()
+        hospital_id = hospital.id
+        assert [hospital.ecef_x, hospital.ecef_y, hospital.ecef_z] == pytest.approx(unit_vector(19.076, 72.8777).tolist())
+
+        hospital.latitude, hospital.longitude = 13.0827, 80.2707
+        db.commit()
+        hospital = db.get(Hospital, hospital_id)
+        assert [hospital.ecef_x, hospital.ecef_y, hospital.ecef_z] == pytest.approx(unit_vector(13.0827, 80.2707).tolist())
+
+    nearest = HospitalFinderSQL().find_nearby_hospitals(13.0827, 80.2707, radius_km=1, limit=1)
+    assert [h['name'] for h in nearest] == ['New Hospital']
@@ -0,0 +1,68 @@
+"""
+Tests for RequestBatcher: results scatter back to their callers, and a failing
+or misbehaving batch function fails only its own requests
+"""
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# Add backend/app to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend', 'app'))
+
+from request_batcher import RequestBatcher
+
+
+def test_results_scatter_to_each_caller():
+    calls = []
+
+    def double(payloads):
+        calls.append(list(payloads))
+        return [payload * 2 for payload in payloads]
+
+    batcher = RequestBatcher(double, batch_wait_ms=50)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda n: batcher.submit(n % 4, n % 4), range(8)))
+
+    assert results == [(n % 4) * 2 for n in range(8)]
+    # Duplicate keys are computed once per batch
+    assert all(len(batch) == len(set(batch)) for batch in calls)
+
+
+def test_failing_payload_only_fails_its_caller():
+    def check(payloads):
+        if 'bad' in payloads:
+            raise ValueError('bad payload')
+        return [payload.upper() for payload in payloads]
+
+    batcher = RequestBatcher(check, batch_wait_ms=50)
+    with ThreadPoolExecutor(2) as pool:
+        good = pool.submit(batcher.submit, 'good', 'good')
+        bad = pool.submit(batcher.submit, 'bad', 'bad')
+        assert good.result() == 'GOOD'
+        with pytest.raises(ValueError):
+            bad.result()
+
+
+def test_short_batch_results_fail_the_callers_and_keep_the_worker():
+    batcher = RequestBatcher(lambda payloads: [], batch_wait_ms=1)
+    with pytest.raises(IndexError):
+        batcher.submit('a', 'a', timeout=5)
+
+    batcher.batch_fn = lambda payloads: list(payloads)
+    assert batcher.submit('b', 'b', timeout=5) == 'b'
+
+
+def test_worker_errors_outside_batch_fn_reach_the_callers(monkeypatch):
+    batcher = RequestBatcher(lambda payloads: list(payloads), batch_wait_ms=1)
+
+    def broken(items):
+        raise RuntimeError('scatter failed')
+
+    monkeypatch.setattr(batcher, '_process', broken)
+    with pytest.raises(RuntimeError):
+        batcher.submit('a', 'a', timeout=5)
+
+    monkeypatch.undo()
+    assert batcher.submit('b', 'b', timeout=5) == 'b'
@@ -0,0 +1,84 @@
+"""
+Tests for decoding the /api/medicine/analyze body: msgspec and the json fallback
+must accept and reject the same bodies and produce the same AnalyzeRequest
+"""
+import sys
+import os
+
+import pytest
+
+# SQLite in memory, so importing the API needs no PostgreSQL server
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+# Add backend/app to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend', 'app'))
+
+import api
+from api import AnalyzeRequest, REQUEST_DECODE_ERRORS, _parse_body
+
+
+VALID_BODIES = [
+    (b'', AnalyzeRequest()),
+    (b'{}', AnalyzeRequest()),
+    (b'{"symptoms": ["fever", "cough"], "age": 30, "gender": "male"}',
+     AnalyzeRequest(symptoms=['fever', 'cough'], age=30, gender='male')),
+    (b'{"symptoms": "fever", "age": 30.5, "location": null, "gender": null}',
+     AnalyzeRequest(symptoms='fever', age=30.5)),
+    (b'{"lat": 12, "lon": 77.5}', AnalyzeRequest(lat=12.0, lon=77.5)),
+    (b'{"allergies": null, "pregnant": null, "symptoms": null}',
+     AnalyzeRequest(allergies=None, pregnant=None, symptoms=None)),
+    (b'{"extra": 1, "timestamp": 5}', AnalyzeRequest(timestamp=5)),
+]
+
+INVALID_BODIES = [
+    b'not json',
+    b'[1, 2]',
+    b'{"age": true}',
+    b'{"lat": 12, "lon": "x"}',
+    b'{"symptoms": [1]}',
+    b'{"gender": 5}',
+    b'{"allergies": ["x", 2]}',
+    b'{"pregnant": 1}',
+]
+
+
+@pytest.fixture(params=['msgspec', 'json'])
+def decoder(request, monkeypatch):
+    if request.param == 'msgspec':
+        if api.msgspec is None:
+            pytest.skip('msgspec is not installed')
+    else:
+        monkeypatch.setattr(api, 'msgspec', None)
+    return request.param
+
+
+def _decode(body):
+    with api.app.test_request_context(data=body, content_type='application/json'):
+        return _parse_body(AnalyzeRequest)
+
+
+@pytest.mark.parametrize('body, expected', VALID_BODIES)
+def test_valid_bodies_decode(decoder, body, expected):
+    req = _decode(body)
+    assert req == expected
+    assert type(req.lat) is type(expected.lat)
+    assert type(req.age) is type(expected.age)
+
+
+@pytest.mark.parametrize('body', INVALID_BODIES)
+def test_invalid_bodies_are_rejected(decoder, body):
+    with pytest.raises(REQUEST_DECODE_ERRORS):
+        _decode(body)
+
+
+def test_null_location_and_gender_fall_back_to_defaults(decoder):
+    req = _decode(b'{"symptoms": ["fever"], "location": null, "gender": null}')
+    assert req.location == ''
+    assert req.gender == 'other'
+
+
+def test_analyze_rejects_mistyped_body(decoder):
+    response = api.app.test_client().post('/api/medicine/analyze', data=b'{"age": "thirty"}',
+                                          content_type='application/json')
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False